@@ -0,0 +1,80 @@
+"""
+Configuration of the benchmarks.
+
+Run with::
+
+    pytest benchmarks --benchmark-json=benchmarks.json
+
+and compare with a previous run with ``--benchmark-compare``.
+"""
+
+import multiprocessing
+import resource
+import sys
+import tracemalloc
+
+import pytest
+
+
+def measure_python_heap(function):
+    """
+    Call `function` and return the peak of the memory traced by Python (NumPy included), in bytes.
+
+    This is the Python heap only: the allocations of STIR (projection matrix,
+    projection data and volumes) are not traced.
+    """
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def _max_rss_bytes():
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == 'darwin' else 1024 * max_rss
+
+def _measure_rss_child(function, connection):
+    start = _max_rss_bytes()
+    function()
+    connection.send((start, _max_rss_bytes()))
+    connection.close()
+
+def measure_rss(function):
+    """
+    Call `function` in a forked process and return its peak resident memory,
+    and the resident memory at the start of the call, in bytes.
+
+    The peak includes the C++ allocations of STIR, and the memory inherited
+    from the benchmark process (modules, set-up projectors...).
+    Each call gets its own process, since the peak of a process never decreases.
+    """
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_measure_rss_child, args=(function, sender))
+    process.start()
+    sender.close()
+    try:
+        start, peak = receiver.recv()
+    finally:
+        process.join()
+    return start, peak
+
+@pytest.fixture
+def record_memory(benchmark):
+    """
+    Store the memory used by a function in the benchmark results.
+
+    The function is called twice more, outside of the timed rounds:
+    in a forked process for the peak resident memory, and traced
+    for the Python heap (tracing slows it down).
+    The traced call also warms up the caches, for instance the registry of set-up projectors.
+    """
+    def record(function):
+        start, peak = measure_rss(function)
+        benchmark.extra_info['peak_rss_bytes'] = peak
+        benchmark.extra_info['rss_increase_bytes'] = peak - start
+        benchmark.extra_info['python_heap_peak_bytes'] = measure_python_heap(function)
+    return record
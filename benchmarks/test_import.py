@@ -0,0 +1,22 @@
+"""
+Import time of the package, which matters for short-lived worker processes.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+
+def _import(module):
+    subprocess.check_call([sys.executable, '-c', 'import {}'.format(module)])
+
+@pytest.mark.parametrize('module', ['odlpet', 'odlpet.scanner.compression', 'stir', 'odl'])
+def test_import(benchmark, module):
+    """
+    Time of a fresh interpreter importing `module`; compare odlpet with the
+    STIR and ODL imports it defers.
+    """
+    benchmark.pedantic(_import, args=(module,), rounds=5)
@@ -0,0 +1,82 @@
+"""
+Benchmarks of the projector construction, forward and back projections,
+and sweeps over subsets, for several scanners and compression settings.
+"""
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from odlpet.scanner.scanner import Scanner, mCT
+from odlpet.scanner.compression import Compression
+
+
+SCANNERS = {
+    'default': Scanner,
+    'mCT': mCT,
+    'ECAT 931': lambda: Scanner.from_name('ECAT 931'),
+    'ECAT 962': lambda: Scanner.from_name('ECAT 962'),
+}
+
+def get_compression(scanner_name, span=1, view_factor=1):
+    compression = Compression(SCANNERS[scanner_name]())
+    compression.span_num = span
+    compression.num_of_views //= view_factor
+    return compression
+
+geometries = pytest.mark.parametrize('scanner_name,span,view_factor,zoom', [
+    ('default', 1, 1, .5),
+    ('mCT', 1, 1, 1.),
+    ('mCT', 3, 1, 1.),
+    ('mCT', 1, 2, 1.),
+    ('mCT', 1, 1, .5),
+    ('ECAT 931', 3, 2, .5),
+    ('ECAT 962', 3, 2, .5),
+])
+
+@geometries
+def test_construction(benchmark, record_memory, scanner_name, span, view_factor, zoom):
+    compression = get_compression(scanner_name, span, view_factor)
+    stir_domain = compression.get_stir_domain(zoom=zoom)
+    build = lambda: compression.get_projector(stir_domain=stir_domain)
+    record_memory(build)
+    benchmark(build)
+
+@geometries
+def test_forward(benchmark, record_memory, scanner_name, span, view_factor, zoom):
+    compression = get_compression(scanner_name, span, view_factor)
+    proj = compression.get_projector(stir_domain=compression.get_stir_domain(zoom=zoom))
+    x = proj.domain.one()
+    out = proj.range.element()
+    project = lambda: proj(x, out=out)
+    record_memory(project)
+    benchmark(project)
+
+@geometries
+def test_back(benchmark, record_memory, scanner_name, span, view_factor, zoom):
+    compression = get_compression(scanner_name, span, view_factor)
+    proj = compression.get_projector(stir_domain=compression.get_stir_domain(zoom=zoom))
+    y = proj.range.one()
+    out = proj.domain.element()
+    back_project = lambda: proj.adjoint(y, out=out)
+    record_memory(back_project)
+    benchmark(back_project)
+
+@pytest.mark.parametrize('num_subsets', [1, 4, 12])
+@pytest.mark.parametrize('scanner_name', ['mCT', 'ECAT 931'])
+def test_subset_sweep(benchmark, record_memory, scanner_name, num_subsets):
+    """
+    Forward and back projection through all the subsets, as in one OSEM iteration.
+    """
+    compression = get_compression(scanner_name)
+    projs, _ = compression.get_projectors(num_subsets=num_subsets,
+                                          stir_domain=compression.get_stir_domain(zoom=.5))
+    x = projs[0].domain.one()
+    y = projs[0].range.element()
+    back = projs[0].domain.element()
+    def sweep():
+        for proj in projs:
+            proj(x, out=y)
+            proj.adjoint(y, out=back)
+    record_memory(sweep)
+    benchmark(sweep)
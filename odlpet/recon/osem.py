@@ -0,0 +1,106 @@
+"""
+MLEM and OSEM reconstruction with the subset projectors of `Compression.get_projectors`.
+
+The model of the data is ``attenuation * A x + background``.
+The updates are multiplicative and done in place, and the temporaries are
+allocated once for the whole reconstruction.
+"""
+
+import time
+
+import numpy as np
+
+
+def get_sensitivities(projectors, attenuation=None):
+    """
+    Sensitivity image of each subset projector, that is, the back projection of the
+    attenuation factors (or of ones if there is no attenuation).
+    """
+    sensitivities = []
+    for proj in projectors:
+        if attenuation is None:
+            weights = proj.range.one()
+        else:
+            weights = proj.range.element(attenuation)
+        sensitivities.append(proj.adjoint(weights))
+    return sensitivities
+
+def _inverse(sensitivity):
+    """
+    Inverse of the sensitivity, zero where the sensitivity is zero.
+    """
+    arr = np.asarray(sensitivity, dtype=np.float32)
+    inverse = np.zeros_like(arr)
+    np.divide(1, arr, out=inverse, where=arr > 0)
+    return inverse
+
+def osem(projectors, x, data, niter=1, background=None, attenuation=None,
+         sensitivities=None, callback=None):
+    """
+    Ordered subsets expectation maximisation.
+
+    projectors: the subset projectors, for instance from `Compression.get_projectors`
+    x: initial (positive) volume, updated in place
+    data: measured projection data
+    background: additive background (randoms, scatter), optional
+    attenuation: multiplicative attenuation (and normalisation) factors, optional
+    sensitivities: precomputed sensitivity images of the subsets, optional
+    callback: called with `x` after each iteration
+
+    Returns the list of the iteration times in seconds.
+    """
+    if sensitivities is None:
+        sensitivities = get_sensitivities(projectors, attenuation)
+    if len(sensitivities) != len(projectors):
+        raise ValueError("{} sensitivities for {} subsets".format(len(sensitivities), len(projectors)))
+    inverse_sensitivities = [_inverse(sensitivity) for sensitivity in sensitivities]
+
+    data_sp = projectors[0].range
+    data_arr = np.asarray(data, dtype=np.float32)
+    if attenuation is not None:
+        attenuation = np.asarray(attenuation, dtype=np.float32)
+    if background is not None:
+        background = np.asarray(background, dtype=np.float32)
+
+    # temporaries
+    estimate = data_sp.element()
+    estimate_arr = estimate.asarray()
+    positive = np.empty(data_sp.shape, dtype=bool)
+    update = projectors[0].domain.element()
+    update_arr = update.asarray()
+    x_arr = x.asarray()
+
+    times = []
+    for iteration in range(niter):
+        start = time.perf_counter()
+        for proj, inverse_sensitivity in zip(projectors, inverse_sensitivities):
+            proj(x, out=estimate)
+            if attenuation is not None:
+                estimate_arr *= attenuation
+            if background is not None:
+                estimate_arr += background
+            # ratio of measured to estimated data, zero where nothing is expected
+            np.greater(estimate_arr, 0, out=positive)
+            np.divide(data_arr, estimate_arr, out=estimate_arr, where=positive)
+            np.multiply(estimate_arr, positive, out=estimate_arr)
+            if attenuation is not None:
+                estimate_arr *= attenuation
+            proj.adjoint(estimate, out=update)
+            update_arr *= inverse_sensitivity
+            x_arr *= update_arr
+        times.append(time.perf_counter() - start)
+        if callback is not None:
+            callback(x)
+    return times
+
+def mlem(projector, x, data, niter=1, background=None, attenuation=None,
+         sensitivity=None, callback=None):
+    """
+    Maximum likelihood expectation maximisation, that is, OSEM with one subset.
+
+    See `osem` for the parameters.
+    """
+    sensitivities = None if sensitivity is None else [sensitivity]
+    return osem([projector], x, data, niter=niter,
+                background=background, attenuation=attenuation,
+                sensitivities=sensitivities, callback=callback)
@@ -0,0 +1,91 @@
+"""
+Sensitivity images cached in memory and on disk.
+
+The sensitivity images only depend on the geometry, the subsets, the field of view
+and the attenuation (or normalisation) factors, so they are computed once
+and reused for every reconstruction with the same parameters.
+"""
+
+import hashlib
+
+import numpy as np
+
+from .osem import get_sensitivities
+from ..stir.space import space_from_stir_domain
+from ..utils.cache import DiskCache
+
+
+def hash_array(array):
+    """
+    Hash of the float32 values of an array.
+    """
+    data = np.ascontiguousarray(array, dtype=np.float32)
+    digest = hashlib.sha1(data.view(np.uint8))
+    digest.update(repr(data.shape).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SensitivityCache(object):
+
+    """
+    Per-subset sensitivity images, cached in memory and on disk.
+    """
+
+    def __init__(self, disk_cache=None):
+        """
+        disk_cache: a `DiskCache` (the default cache directory if None)
+        """
+        if disk_cache is None:
+            disk_cache = DiskCache()
+        self.disk_cache = disk_cache
+        self._memory = {}
+
+    def get_key(self, compression, num_subsets, stir_domain, stir_proj_data_info,
+                restrict_to_cylindrical_FOV=True, attenuation=None, backend='stir'):
+        if attenuation is None:
+            weights = None
+        else:
+            weights = hash_array(attenuation)
+        return compression.get_geometry_key(
+            stir_domain, stir_proj_data_info,
+            'sensitivity', int(num_subsets), bool(restrict_to_cylindrical_FOV), weights, str(backend))
+
+    def get_sensitivities(self, compression, num_subsets=1,
+                          stir_domain=None, stir_proj_data_info=None,
+                          restrict_to_cylindrical_FOV=True, attenuation=None,
+                          backend='stir'):
+        """
+        Sensitivity images of the subsets of `compression.get_projectors`.
+
+        attenuation: multiplicative attenuation or normalisation factors, optional
+        backend: backend of `compression.get_projectors`, part of the cache key
+        (the sparse backend reads its system matrix from the same disk cache)
+        """
+        if stir_domain is None:
+            stir_domain = compression.get_stir_domain()
+        if stir_proj_data_info is None:
+            stir_proj_data_info = compression._get_shared_stir_proj_data_info()
+        key = self.get_key(compression, num_subsets, stir_domain, stir_proj_data_info,
+                           restrict_to_cylindrical_FOV, attenuation, backend)
+
+        if key not in self._memory:
+            stored = self.disk_cache.get(key)
+            if stored is None:
+                projectors, _ = compression.get_projectors(
+                    num_subsets, stir_domain, stir_proj_data_info,
+                    restrict_to_cylindrical_FOV, backend=backend, cache=self.disk_cache)
+                sensitivities = np.stack([s.asarray() for s in get_sensitivities(projectors, attenuation)])
+                self.disk_cache.put(key, sensitivities=sensitivities)
+            else:
+                sensitivities = stored['sensitivities']
+            self._memory[key] = sensitivities
+
+        space = space_from_stir_domain(stir_domain)
+        # copies, so that the cached images cannot be modified
+        return [space.element(sensitivity.copy()) for sensitivity in self._memory[key]]
+
+    def clear(self):
+        """
+        Empty the memory cache.
+        """
+        self._memory.clear()
@@ -1,16 +1,17 @@
+"""
+Compression (sinogram layout) of the data of a scanner, and the corresponding projectors.
+
+The STIR bindings, ODL and SciPy are only imported when first needed,
+so that importing this module is fast.
+"""
+
+import copy
+import functools
+from collections import namedtuple
+
 import numpy as np
-from ..stir.space import space_from_stir_domain
-from ..stir.bindings import ForwardProjectorByBinWrapper, get_view_mask
-from .sinogram import get_offset, get_range_from_proj_data
-from .scanner import Scanner
-from ..utils.slicing import SlicingProjectionOperator
-
-from stir import (FloatCartesianCoordinate3D,
-                  IntCartesianCoordinate3D,
-                  FloatVoxelsOnCartesianGrid,
-                  ProjDataInMemory,
-                  ExamInfo,
-                  ProjDataInfo)
+from .sinogram import get_range_from_proj_data, get_subset_view_mask, get_sinogram_info, SinogramIndex
+from .scanner import Scanner, ScannerConfig
 
 class Compression:
     def __init__(self, scanner=None):
@@ -70,8 +71,9 @@ class Compression:
         return cls(scanner)
 
     def get_stir_proj_data(self, stir_proj_data_info=None, initialize_to_zero=True):
+        from stir import ProjDataInMemory, ExamInfo
         if stir_proj_data_info is None:
-            stir_proj_data_info = self.get_stir_proj_data_info()
+            stir_proj_data_info = self._get_shared_stir_proj_data_info()
         exam_info = ExamInfo()
         proj_data = ProjDataInMemory(exam_info, stir_proj_data_info, initialize_to_zero)
         return proj_data
@@ -108,6 +110,7 @@ class Compression:
         .todo :: File a bug report
 
         """
+        from stir import FloatCartesianCoordinate3D, IntCartesianCoordinate3D, FloatVoxelsOnCartesianGrid
         if sizes is None:
             sizes = [-1,-1,-1]
         sizes_ = IntCartesianCoordinate3D(*sizes)
@@ -116,24 +119,147 @@ class Compression:
             offset = [0.,0.,0.]
         offset_ = FloatCartesianCoordinate3D(*offset)
 
-        proj_info = self.get_stir_proj_data_info()
+        proj_info = self._get_shared_stir_proj_data_info()
 
         return FloatVoxelsOnCartesianGrid(proj_info, np.float32(zoom), offset_, sizes_)
 
     def _get_sinogram_info(self):
-        proj_info = self.get_stir_proj_data_info()
-        segments = list(range(proj_info.get_min_segment_num(), proj_info.get_max_segment_num()+1))
-        segment_sizes = [proj_info.get_max_axial_pos_num(s)+1 - proj_info.get_min_axial_pos_num(s) for s in segments]
-        return list(zip(segments, segment_sizes))
+        return get_sinogram_info(self._get_shared_stir_proj_data_info())
+
+    def _get_layout_cached(self, name, create):
+        """
+        Object computed by `create`, built once for given scanner and compression settings.
+        """
+        key = self.get_config()
+        cached_key, cached = getattr(self, '_layout_cache', (None, {}))
+        if cached_key != key:
+            cached = {}
+            self._layout_cache = (key, cached)
+        if name not in cached:
+            cached[name] = create()
+        return cached[name]
+
+    def get_sinogram_index(self):
+        """
+        The `SinogramIndex` of the data layout, built once for given scanner and compression settings.
+        """
+        return self._get_layout_cached('sinogram_index', lambda: SinogramIndex(
+            self._get_sinogram_info(), self.num_of_views, self.get_num_tangential()))
+
+    def get_lor_table(self):
+        """
+        The `LORTable` of the detector pairs, built once for given scanner and compression settings.
+        """
+        from .lor import LORTable
+        return self._get_layout_cached('lor_table', lambda: LORTable(self.get_lor_mapping()))
 
     def get_offset(self, segment, axial):
-        info = self._get_sinogram_info()
-        return get_offset(segment, axial, info)
+        """
+        Index of the sinogram at given segment and axial position.
+        Also works with arrays of segments and axial positions.
+        """
+        offset = self.get_sinogram_index().get_sinogram(segment, axial)
+        if np.ndim(offset) == 0:
+            return int(offset)
+        return offset
+
+
+    def get_config(self):
+        """
+        Frozen `CompressionConfig` of the current scanner and settings.
+        """
+        return CompressionConfig.from_compression(self)
+
+    def get_bin_geometry(self):
+        """
+        The `BinGeometry` of the projection data, computed without STIR.
+        """
+        return self.get_config().get_bin_geometry()
+
+    def get_space(self, zoom=1., sizes=None, offset=None):
+        """
+        ODL space of the volume, with the default sizes and voxel sizes of `get_stir_domain`,
+        computed without STIR.
+        """
+        return self.get_config().get_space(zoom, sizes, offset)
+
+    def _get_volume_shape(self, stir_domain=None):
+        if stir_domain is None:
+            return self.get_space().shape
+        min_indices = stir_domain.get_min_indices()
+        max_indices = stir_domain.get_max_indices()
+        return tuple(max_indices[i] - min_indices[i] + 1 for i in [1, 2, 3])
+
+    def estimate_memory(self, stir_domain=None, num_buffers=1, max_sinograms=None, num_workers=1):
+        """
+        `MemoryEstimate` of the projections, computed from the geometry only.
+
+        The volume is `stir_domain`, or the default domain of `get_stir_domain` if None.
+        See `odlpet.scanner.memory.estimate_memory` for the parameters.
+        """
+        from .memory import estimate_memory
+        info = self.get_config().get_sinogram_info()
+        return estimate_memory(info, self.num_of_views, self.get_num_tangential(),
+                               self._get_volume_shape(stir_domain),
+                               num_buffers=num_buffers, max_sinograms=max_sinograms,
+                               num_workers=num_workers)
+
+    def plan_execution(self, memory_budget, stir_domain=None, num_subsets=None, max_workers=None):
+        """
+        `ExecutionPlan` of the projections fitting in `memory_budget` bytes:
+        the number of subsets and workers of `get_parallel_projector` if the data fit in memory,
+        the block size of `get_streaming_projector` otherwise.
 
+        num_subsets: number of subsets, or None to choose it (see `memory.plan_execution`)
+        max_workers: maximum number of processes (default: number of CPUs)
+        """
+        import os
+        from .memory import plan_execution
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        info = self.get_config().get_sinogram_info()
+        return plan_execution(memory_budget, info, self.num_of_views, self.get_num_tangential(),
+                              self._get_volume_shape(stir_domain),
+                              num_subsets=num_subsets, max_workers=max_workers)
 
     def get_projector(self, stir_domain=None, stir_proj_data_info=None,
                       subset_num=0, num_subsets=1,
-                      restrict_to_cylindrical_FOV=True):
+                      restrict_to_cylindrical_FOV=True, max_buffers=None,
+                      backend='stir', num_threads=None, cache=None):
+        """
+        max_buffers: maximum number of concurrent evaluations (unbounded if None),
+        to bound the memory used by STIR buffers.
+        backend: 'stir'; 'sparse' for the system matrix of `get_system_matrix`,
+        read from the disk `cache` (no STIR matrix is set up once the matrix is cached);
+        or 'numpy' for the `JosephProjector`, which does not need STIR
+        unless `stir_domain` is given (the domain is `get_space()` otherwise)
+        num_threads: number of threads of the 'sparse' and 'numpy' backends
+        """
+        if backend == 'numpy':
+            return self._get_joseph_projector(stir_domain, subset_num, num_subsets,
+                                              restrict_to_cylindrical_FOV, num_threads)
+        if backend == 'sparse':
+            return self._get_sparse_subset_projectors(
+                [subset_num], num_subsets, stir_domain, stir_proj_data_info,
+                restrict_to_cylindrical_FOV, cache, num_threads)[0]
+        if backend != 'stir':
+            raise ValueError("Unknown backend {!r}".format(backend))
+        return self._get_subset_projectors(
+            [subset_num], num_subsets,
+            stir_domain, stir_proj_data_info,
+            restrict_to_cylindrical_FOV, max_buffers)[0]
+
+    def _get_subset_projectors(self, subset_nums, num_subsets=1,
+                               stir_domain=None, stir_proj_data_info=None,
+                               restrict_to_cylindrical_FOV=True, max_buffers=None):
+        """
+        Projectors for the given subsets.
+        They all share the same projection matrix, pool of STIR buffers and spaces.
+        """
+        from ..stir.space import space_from_stir_domain
+        from ..stir.bindings import ForwardProjectorByBinWrapper
+        from ..stir.registry import get_projectors
+        from ..stir.pool import BufferPool
         if stir_domain is None:
             stir_domain = self.get_stir_domain()
 
@@ -142,25 +268,223 @@ class Compression:
         recon_sp = space_from_stir_domain(stir_domain)
         data_sp = get_range_from_proj_data(stir_proj_data, radius=self.scanner.det_radius)
 
-        return ForwardProjectorByBinWrapper(
+        projector, back_projector = get_projectors(
+            stir_proj_data.get_proj_data_info(), stir_domain,
+            restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV)
+
+        pool = BufferPool(stir_domain, stir_proj_data, max_size=max_buffers)
+
+        return [ForwardProjectorByBinWrapper(
             recon_sp, data_sp,
             stir_domain, stir_proj_data,
             subset_num=subset_num, num_subsets=num_subsets,
-            restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV)
+            projector=projector, back_projector=back_projector,
+            pool=pool)
+                for subset_num in subset_nums]
+
+    def _get_sparse_subset_projectors(self, subset_nums, num_subsets=1,
+                                      stir_domain=None, stir_proj_data_info=None,
+                                      restrict_to_cylindrical_FOV=True, cache=None, num_threads=None):
+        """
+        Projectors for the given subsets, using the cached system matrix restricted to the subset views.
+        """
+        from ..utils.sparse import restrict_rows
+        full = self.get_sparse_projector(stir_domain, stir_proj_data_info,
+                                         restrict_to_cylindrical_FOV, cache, num_threads)
+        if num_subsets == 1:
+            return [full for _ in subset_nums]
+        shape = full.range.shape
+        projectors = []
+        for subset_num in subset_nums:
+            mask = get_subset_view_mask(shape[1], subset_num, num_subsets)
+            rows = np.broadcast_to(mask[None, :, None], shape)
+            projectors.append(type(full)(full.domain, full.range, restrict_rows(full.matrix, rows),
+                                         num_threads=num_threads))
+        return projectors
+
+    def _get_joseph_projector(self, stir_domain=None, subset_num=0, num_subsets=1,
+                              restrict_to_cylindrical_FOV=True, num_threads=None):
+        from .sinogram import get_subset_views
+        from ..utils.joseph import JosephProjector
+        config = self.get_config()
+        if stir_domain is None:
+            recon_sp = config.get_space()
+        else:
+            from ..stir.space import space_from_stir_domain
+            recon_sp = space_from_stir_domain(stir_domain)
+        geometry = config.get_bin_geometry()
+        data_sp = config.get_range()
+        views = get_subset_views(geometry.shape[1], subset_num, num_subsets)
+        return JosephProjector(recon_sp, data_sp, geometry, views=views,
+                               restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV,
+                               num_threads=num_threads)
+
+    def get_geometry_key(self, stir_domain=None, stir_proj_data_info=None, *extra):
+        """
+        Hash of the scanner, compression settings, domain and `extra`, suitable as a cache key.
+        """
+        from ..stir.matrix import geometry_key
+        if stir_domain is None:
+            stir_domain = self.get_stir_domain()
+        if stir_proj_data_info is None:
+            stir_proj_data_info = self._get_shared_stir_proj_data_info()
+        return geometry_key(stir_proj_data_info, stir_domain, self._get_settings(), *extra)
+
+    def _get_settings(self):
+        return (self.span_num, self.max_diff_ring, self.data_arc_corrected, self.tof_mash_factor)
+
+    def get_system_matrix(self, stir_domain=None, stir_proj_data_info=None,
+                          restrict_to_cylindrical_FOV=True, cache=None, compute=True):
+        """
+        CSR arrays of the ray-tracing projection matrix, stored in an on-disk cache.
+
+        The cache key is a hash of the scanner, compression settings and domain,
+        so the matrix is only computed once per geometry.
+        cache: a `DiskCache`, or None for the default cache directory
+        compute: if False, return None when the matrix is not in the cache yet
+        """
+        from ..stir.matrix import get_cached_matrix_data
+        if stir_domain is None:
+            stir_domain = self.get_stir_domain()
+        if stir_proj_data_info is None:
+            stir_proj_data_info = self._get_shared_stir_proj_data_info()
+        return get_cached_matrix_data(stir_proj_data_info, stir_domain,
+                                      restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV,
+                                      cache=cache, extra_key=self._get_settings(),
+                                      compute=compute)
+
+    def get_sparse_projector(self, stir_domain=None, stir_proj_data_info=None,
+                             restrict_to_cylindrical_FOV=True, cache=None, num_threads=None):
+        """
+        Projector using the system matrix of `get_system_matrix` as a SciPy sparse matrix.
+
+        It has the same domain and range as the STIR projector of `get_projector`.
+        """
+        from ..stir.space import space_from_stir_domain
+        from ..utils.sparse import SparseMatrixOperator, sparse_matrix_from_data
+        if stir_domain is None:
+            stir_domain = self.get_stir_domain()
+        arrays = self.get_system_matrix(stir_domain, stir_proj_data_info,
+                                        restrict_to_cylindrical_FOV, cache)
+        stir_proj_data = self.get_stir_proj_data(stir_proj_data_info)
+        recon_sp = space_from_stir_domain(stir_domain)
+        data_sp = get_range_from_proj_data(stir_proj_data, radius=self.scanner.det_radius)
+        return SparseMatrixOperator(recon_sp, data_sp, sparse_matrix_from_data(arrays),
+                                    num_threads=num_threads)
+
+    def get_lor_mapping(self):
+        """
+        Mapping of detector pairs to the bins of the projection data.
+        """
+        from .lor import LORMapping
+        if self.data_arc_corrected:
+            raise ValueError("Detector pairs can only be mapped to non arc-corrected data")
+        return LORMapping(self.scanner.num_dets_per_ring, self.scanner.num_rings,
+                          self.span_num, self.max_diff_ring,
+                          self.num_of_views, self.get_num_tangential(),
+                          self._get_sinogram_info())
+
+    def get_listmode_projector(self, det1, ring1, det2, ring2, stir_domain=None,
+                               restrict_to_cylindrical_FOV=True, cache=None, num_threads=None):
+        """
+        Projector whose range is the list of events given by the detector pairs
+        (det1, ring1), (det2, ring2).
+
+        Each event is projected with the row of its bin in the system matrix.
+        If the matrix of `get_system_matrix` is in the cache, its rows are used;
+        otherwise only the rows of the bins hit by the events are computed with STIR,
+        so the cost only depends on the number of events.
+        Events outside the projection data have zero projections.
+        """
+        from odl import rn
+        from scipy import sparse
+        from ..stir.bindings import get_proj_matrix
+        from ..stir.matrix import get_bin_numbers, get_matrix_rows
+        from ..stir.space import space_from_stir_domain
+        from ..utils.sparse import SparseMatrixOperator, sparse_matrix_from_data
+        if stir_domain is None:
+            stir_domain = self.get_stir_domain()
+        indices, valid = self.get_lor_table().get_indices(det1, ring1, det2, ring2)
+        arrays = self.get_system_matrix(stir_domain, None, restrict_to_cylindrical_FOV, cache, compute=False)
+        if arrays is None:
+            # one row per distinct bin, and an empty row for the events outside the data
+            bins, inverse = np.unique(indices[valid], return_inverse=True)
+            proj_data_info = self._get_shared_stir_proj_data_info()
+            proj_matrix = get_proj_matrix(proj_data_info, stir_domain,
+                                          restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV)
+            numbers = get_bin_numbers(proj_data_info, *self.get_sinogram_index().unravel(bins))
+            matrix = sparse_matrix_from_data(get_matrix_rows(proj_matrix, numbers, stir_domain))
+            matrix = sparse.vstack([matrix, sparse.csr_matrix((1, matrix.shape[1]), dtype=matrix.dtype)],
+                                   format='csr')
+            indices = np.full(valid.shape, len(bins), dtype=np.int64)
+            indices[valid] = inverse
+        else:
+            matrix = sparse_matrix_from_data(arrays)
+        rows = sparse.diags(valid.astype(matrix.dtype)).dot(matrix[indices])
+        recon_sp = space_from_stir_domain(stir_domain)
+        return SparseMatrixOperator(recon_sp, rn(len(indices), dtype='float32'), rows,
+                                    num_threads=num_threads)
 
     def get_projectors(self, num_subsets=1,
                        stir_domain=None, stir_proj_data_info=None,
-                       restrict_to_cylindrical_FOV=True):
-        projs = [self.get_projector(stir_domain, stir_proj_data_info, i, num_subsets, restrict_to_cylindrical_FOV) for i in range(num_subsets)]
-        masks = [get_view_mask(proj) for proj in projs]
+                       restrict_to_cylindrical_FOV=True, max_buffers=None,
+                       backend='stir', cache=None, num_threads=None):
+        """
+        Subset projectors and the slicing operators onto the views of each subset.
+
+        backend: 'stir', or 'sparse' for the cached system matrix (see `get_projector`)
+        """
+        from ..utils.slicing import SlicingProjectionOperator
+        if backend == 'sparse':
+            projs = self._get_sparse_subset_projectors(range(num_subsets), num_subsets, stir_domain, stir_proj_data_info, restrict_to_cylindrical_FOV, cache, num_threads)
+        elif backend == 'stir':
+            projs = self._get_subset_projectors(range(num_subsets), num_subsets, stir_domain, stir_proj_data_info, restrict_to_cylindrical_FOV, max_buffers)
+        else:
+            raise ValueError("Unknown backend {!r}".format(backend))
+        # views of each subset, following the symmetries of the projection matrix
+        num_views = projs[0].range.shape[1]
+        masks = [get_subset_view_mask(num_views, subset_num, num_subsets) for subset_num in range(num_subsets)]
         slice_ops = [SlicingProjectionOperator(proj.range, slicing=(slice(None), mask, slice(None))) for (proj,mask) in zip(projs, masks)]
         return projs, slice_ops
 
+    def get_parallel_projector(self, num_subsets, num_workers=None,
+                               zoom=1., sizes=None, offset=None,
+                               restrict_to_cylindrical_FOV=True):
+        """
+        Full projector whose subset projections are computed on `num_workers` processes.
+
+        The domain is given by `get_stir_domain` with the `zoom`, `sizes` and `offset` parameters.
+        """
+        from ..stir.parallel import ProjectorSpec, ParallelForwardProjector
+        spec = ProjectorSpec(copy.deepcopy(self), num_subsets, zoom, sizes, offset,
+                             restrict_to_cylindrical_FOV)
+        return ParallelForwardProjector(spec, num_workers)
+
+    def get_streaming_projector(self, stir_domain=None, stir_proj_data_info=None,
+                                max_sinograms=None, restrict_to_cylindrical_FOV=True):
+        """
+        Projector computing the projection data by blocks of at most `max_sinograms`
+        sinograms (one segment at a time if None), to bound the memory used by STIR.
+        """
+        from ..stir.space import space_from_stir_domain
+        from ..stir.streaming import StreamingForwardProjector
+        if stir_domain is None:
+            stir_domain = self.get_stir_domain()
+        if stir_proj_data_info is None:
+            stir_proj_data_info = self._get_shared_stir_proj_data_info()
+        recon_sp = space_from_stir_domain(stir_domain)
+        data_sp = get_range_from_proj_data(stir_proj_data_info, radius=self.scanner.det_radius)
+        return StreamingForwardProjector(recon_sp, data_sp, stir_domain, stir_proj_data_info,
+                                         max_sinograms=max_sinograms,
+                                         restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV)
+
     def get_default_num_tangential(self):
+        # the defaults of the scanner are filled in by its configuration
+        scanner = ScannerConfig.from_scanner(self.scanner)
         if self.data_arc_corrected:
-            num_bins = self.scanner.default_non_arc_cor_bins
+            num_bins = scanner.default_non_arc_cor_bins
         else:
-            num_bins = self.scanner.max_num_non_arc_cor_bins
+            num_bins = scanner.max_num_non_arc_cor_bins
         return num_bins
 
     def get_num_tangential(self):
@@ -174,16 +498,143 @@ class Compression:
         return self.scanner.num_rings - 1
 
     def get_stir_proj_data_info(self):
-        _stir_scanner = self.scanner.get_stir_scanner()
-        proj_data_info = ProjDataInfo.construct_proj_data_info(
-            _stir_scanner,
-            self.span_num,
-            self.max_diff_ring,
-            self.num_of_views,
-            self.get_num_tangential(),
-            self.data_arc_corrected,
-            self.tof_mash_factor)
-        return proj_data_info
+        """
+        New STIR projection data info of the current settings, which the caller may modify.
+        """
+        return self.get_config().get_stir_proj_data_info()
+
+    def _get_shared_stir_proj_data_info(self):
+        # built once per configuration and shared by the projectors: never modified
+        return _get_stir_proj_data_info_from_config(self.get_config())
+
+
+class CompressionConfig(namedtuple('CompressionConfig', [
+        'scanner', 'span_num', 'max_diff_ring', 'num_of_views', 'num_tangential',
+        'data_arc_corrected', 'tof_mash_factor'])):
+
+    """
+    Immutable and hashable compression settings of a `ScannerConfig`.
+
+    The ODL spaces, and the STIR projection data info used by the projectors,
+    are built once per configuration, and the configuration may be used as a key of other caches.
+    """
+
+    @classmethod
+    def from_compression(cls, compression):
+        scanner = ScannerConfig.from_scanner(compression.scanner)
+        num_tangential = compression.num_non_arccor_bins
+        if num_tangential is None:
+            num_tangential = compression.get_default_num_tangential()
+        return cls(scanner, int(compression.span_num), int(compression.max_diff_ring),
+                   int(compression.num_of_views), int(num_tangential),
+                   bool(compression.data_arc_corrected), int(compression.tof_mash_factor))
+
+    def to_compression(self):
+        """
+        Mutable `Compression` with the same settings.
+        """
+        compression = Compression(self.scanner.to_scanner())
+        compression.span_num = self.span_num
+        compression.max_diff_ring = self.max_diff_ring
+        compression.num_of_views = self.num_of_views
+        compression.num_non_arccor_bins = self.num_tangential
+        compression.data_arc_corrected = self.data_arc_corrected
+        compression.tof_mash_factor = self.tof_mash_factor
+        return compression
+
+    def get_sinogram_info(self):
+        """
+        List of pairs (segment, number of axial positions), computed without STIR.
+        """
+        from .geometry import get_sinogram_info_from_rings
+        return get_sinogram_info_from_rings(self.scanner.num_rings, self.span_num, self.max_diff_ring)
+
+    def get_bin_geometry(self):
+        """
+        The `BinGeometry` of the projection data, computed without STIR.
+        """
+        from .geometry import BinGeometry
+        if self.data_arc_corrected:
+            raise ValueError("The bin geometry is only available for non arc-corrected data")
+        scanner = self.scanner
+        return BinGeometry(scanner.num_dets_per_ring, scanner.num_rings, scanner.ring_spacing,
+                           scanner.det_radius + scanner.average_depth_of_inter,
+                           self.span_num, self.max_diff_ring,
+                           self.num_of_views, self.num_tangential,
+                           info=self.get_sinogram_info(),
+                           view_offset=scanner.intrinsic_tilt)
+
+    def get_stir_proj_data_info(self):
+        """
+        New STIR projection data info of this configuration, which the caller may modify.
+        """
+        return _build_stir_proj_data_info(self, self.scanner.get_stir_scanner())
+
+    def get_space(self, zoom=1., sizes=None, offset=None):
+        """
+        ODL space of the volume, as `Compression.get_space`.
+        """
+        return _get_space_from_config(self, float(zoom),
+                                      None if sizes is None else tuple(int(size) for size in sizes),
+                                      None if offset is None else tuple(float(o) for o in offset))
+
+    def get_range(self):
+        """
+        ODL space of the projection data, computed without STIR.
+        """
+        return _get_range_from_config(self)
+
+    def _get_max_tangential_distance(self):
+        if self.data_arc_corrected:
+            return (self.num_tangential // 2) * self.scanner.voxel_size_xy
+        return np.max(np.abs(self.get_bin_geometry().s))
+
+
+@functools.lru_cache(maxsize=64)
+def _get_stir_proj_data_info_from_config(config):
+    """
+    STIR projection data info of a configuration, shared by all the callers: it must not be modified.
+    """
+    from .scanner import _get_stir_scanner_from_config
+    return _build_stir_proj_data_info(config, _get_stir_scanner_from_config(config.scanner))
+
+def _build_stir_proj_data_info(config, stir_scanner):
+    from stir import ProjDataInfo
+    return ProjDataInfo.construct_proj_data_info(
+        stir_scanner,
+        config.span_num,
+        config.max_diff_ring,
+        config.num_of_views,
+        config.num_tangential,
+        config.data_arc_corrected,
+        config.tof_mash_factor)
+
+@functools.lru_cache(maxsize=64)
+def _get_space_from_config(config, zoom, sizes, offset):
+    from odl import uniform_discr
+    scanner = config.scanner
+    voxel_xy = scanner.voxel_size_xy / zoom
+    voxel_sizes = np.array([scanner.ring_spacing / 2, voxel_xy, voxel_xy])
+    if sizes is None:
+        sizes = [-1, -1, -1]
+    if offset is None:
+        offset = [0., 0., 0.]
+    size_xy = 2 * int(np.ceil(config._get_max_tangential_distance() / voxel_xy)) + 1
+    defaults = [2 * scanner.num_rings - 1, size_xy, size_xy]
+    shape = [default if size == -1 else size for (size, default) in zip(sizes, defaults)]
+    # z indices start from 0, x and y indices from -(size/2)
+    # the minimum point is the centre of the first voxel, as in `space_from_stir_domain`
+    min_indices = np.array([0, -(shape[1] // 2), -(shape[2] // 2)])
+    min_pt = np.asarray(offset) + min_indices * voxel_sizes
+    return uniform_discr(min_pt, min_pt + np.array(shape) * voxel_sizes, shape,
+                         axis_labels=["z", "y", "x"], dtype='float32')
+
+@functools.lru_cache(maxsize=64)
+def _get_range_from_config(config):
+    from .sinogram import get_range_from_shape
+    num_sinograms = sum(size for (_, size) in config.get_sinogram_info())
+    return get_range_from_shape((num_sinograms, config.num_of_views, config.num_tangential),
+                                radius=config.scanner.det_radius)
 
 
 
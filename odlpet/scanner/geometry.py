@@ -0,0 +1,107 @@
+"""
+Geometry of the bins of the projection data, computed in NumPy.
+
+It follows the conventions of STIR for non arc-corrected data of cylindrical scanners:
+the line of response of a bin at view angle ``phi`` and tangential position ``s``
+is the set of points ``s*(cos(phi), sin(phi)) + a*(sin(phi), -cos(phi))`` in the (x, y) plane,
+with ``z = m + a*tan(theta)``, where ``m`` is the axial position of the middle of the line
+relative to the centre of the scanner.
+"""
+
+import numpy as np
+
+from .sinogram import segment_reordered_
+
+
+def get_ring_differences(segment, span, max_diff_ring):
+    """
+    Minimum and maximum ring difference of a segment.
+    """
+    half = (span - 1) // 2
+    if segment == 0:
+        low, high = -half, half
+    else:
+        high = half + abs(segment) * span
+        low = high - span + 1
+    high = min(high, max_diff_ring)
+    if segment < 0:
+        low, high = -high, -low
+    elif segment == 0:
+        low = max(low, -max_diff_ring)
+    return low, high
+
+def get_num_segments(span, max_diff_ring):
+    """
+    Number of positive segments, that is, the maximum segment number.
+    """
+    half = (span - 1) // 2
+    return max(0, -(-(max_diff_ring - half) // span))
+
+def get_sinogram_info_from_rings(num_rings, span, max_diff_ring):
+    """
+    List of pairs (segment, number of axial positions), as `get_sinogram_info`, without STIR.
+    """
+    if max_diff_ring >= num_rings:
+        raise ValueError("The maximum ring difference {} should be smaller than the number of rings {}"
+                         "".format(max_diff_ring, num_rings))
+    max_segment = get_num_segments(span, max_diff_ring)
+    info = []
+    for segment in range(-max_segment, max_segment+1):
+        low, high = get_ring_differences(segment, span, max_diff_ring)
+        min_difference = 0 if low <= 0 <= high else min(abs(low), abs(high))
+        if low == high:
+            num_axial = num_rings - min_difference
+        else:
+            num_axial = 2*num_rings - 1 - 2*min_difference
+        info.append((segment, num_axial))
+    return info
+
+
+class BinGeometry(object):
+
+    """
+    View angles, tangential positions, and axial positions and slopes of the sinograms.
+
+    The sinograms are in the order of `get_range_from_proj_data`.
+    """
+
+    def __init__(self, num_dets_per_ring, num_rings, ring_spacing, radius,
+                 span, max_diff_ring, num_views, num_tangential, info=None, view_offset=0.):
+        """
+        radius: effective radius of the rings (inner radius and average depth of interaction)
+        info: list of pairs (segment, number of axial positions), computed if None
+        """
+        if info is None:
+            info = get_sinogram_info_from_rings(num_rings, span, max_diff_ring)
+        self.radius = radius
+        self.ring_spacing = ring_spacing
+        self.phi = view_offset + np.arange(num_views) * np.pi / num_views
+        tangential = np.arange(num_tangential) - num_tangential // 2
+        self.s = radius * np.sin(tangential * np.pi / num_dets_per_ring)
+        middles = []
+        ring_differences = []
+        for (segment, num_axial) in sorted(info, key=lambda item: segment_reordered_(item[0])):
+            low, high = get_ring_differences(segment, span, max_diff_ring)
+            # segments with a single ring difference are sampled once per ring, the others twice
+            increment = 2 if low == high else 1
+            axial = np.arange(num_axial)
+            middles.append(ring_spacing * increment / 2 * (axial - (num_axial - 1) / 2))
+            ring_differences.append(np.full(num_axial, (low + high) / 2))
+        self.m = np.concatenate(middles)
+        self.ring_difference = np.concatenate(ring_differences)
+
+    @property
+    def shape(self):
+        return (len(self.m), len(self.phi), len(self.s))
+
+    def get_half_lengths(self):
+        """
+        Half length of the lines of response in the (x, y) plane, for each tangential position.
+        """
+        return np.sqrt(self.radius**2 - self.s**2)
+
+    def get_tan_theta(self):
+        """
+        Axial slope of the lines of response, of shape (sinograms, tangential positions).
+        """
+        return np.outer(self.ring_difference * self.ring_spacing, 1 / (2 * self.get_half_lengths()))
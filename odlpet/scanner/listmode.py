@@ -0,0 +1,62 @@
+"""
+Histogramming of list-mode events into projection data.
+
+The events are arrays of shape (num_events, 4) of detector pairs
+``(det1, ring1, det2, ring2)``. They are binned by chunks, so event files
+larger than the memory may be histogrammed from a memory map.
+"""
+
+import numpy as np
+
+
+def load_events(event_file, dtype=np.int16):
+    """
+    Memory map of the events of a file.
+
+    event_file: a ``.npy`` file, or a raw file of records (det1, ring1, det2, ring2) of type `dtype`
+    """
+    if str(event_file).endswith('.npy'):
+        events = np.load(event_file, mmap_mode='r')
+    else:
+        events = np.memmap(event_file, dtype=dtype, mode='r')
+    return events.reshape(-1, 4)
+
+def _accumulate(flat, indices):
+    """
+    Add the counts of the indices to the flat array.
+    """
+    if 16 * len(indices) >= len(flat):
+        flat += np.bincount(indices, minlength=len(flat))
+    else:
+        # for few events, sorting them is faster than counting over the whole data
+        unique, counts = np.unique(indices, return_counts=True)
+        flat[unique] += counts
+
+def histogram(events, table, out=None, chunk_size=2**22):
+    """
+    Add the counts of the events to the projection data `out`.
+
+    events: array of shape (num_events, 4), or the path of an event file (see `load_events`)
+    table: a `LORTable`, for instance from `Compression.get_lor_table`
+    out: contiguous float32 array of the projection data, for instance an ODL element
+    (a new array of size `table.size` if None)
+    chunk_size: number of events binned at once
+
+    Returns `out` and the number of events outside the projection data.
+    """
+    if isinstance(events, (str, bytes)) or hasattr(events, '__fspath__'):
+        events = load_events(events)
+    if out is None:
+        out = np.zeros(table.size, dtype=np.float32)
+    # ODL elements and arrays alike are filled in place through a flat view
+    out_array = np.asarray(out)
+    flat = out_array.reshape(-1)
+    if not np.shares_memory(flat, out_array):
+        raise ValueError("The projection data `out` must be contiguous to be filled in place")
+    num_rejected = 0
+    for start in range(0, len(events), chunk_size):
+        chunk = np.asarray(events[start:start+chunk_size])
+        indices, valid = table.get_indices(chunk[:, 0], chunk[:, 1], chunk[:, 2], chunk[:, 3])
+        _accumulate(flat, indices[valid])
+        num_rejected += len(chunk) - np.count_nonzero(valid)
+    return out, num_rejected
@@ -0,0 +1,195 @@
+"""
+Mapping of detector pairs to the bins of the projection data.
+
+The detectors are numbered as in STIR: ``det`` around the ring and ``ring``
+along the axis. The bins are those of non arc-corrected data,
+with the views and tangential positions of the CTI convention used by STIR.
+All the functions work on arrays of detector pairs.
+"""
+
+import numpy as np
+
+from .sinogram import SinogramIndex
+from .geometry import get_ring_differences
+
+
+def get_det_pair(view, tangential, num_dets_per_ring):
+    """
+    Detector pair of uncompressed views and tangential positions.
+
+    view: 0 <= view < num_dets_per_ring/2
+    tangential: -num_dets_per_ring/2 < tangential <= num_dets_per_ring/2
+    """
+    view = np.asarray(view)
+    tangential = np.asarray(tangential)
+    half = num_dets_per_ring // 2
+    det1 = (view + (tangential >> 1)) % num_dets_per_ring
+    det2 = (view - ((tangential + 1) >> 1) + half) % num_dets_per_ring
+    return det1, det2
+
+def get_view_tangential(det1, det2, num_dets_per_ring):
+    """
+    Uncompressed view and tangential position of pairs of detectors on a ring.
+
+    Returns the view, the tangential position and whether the detectors
+    are swapped with respect to `get_det_pair`.
+    """
+    det1 = np.asarray(det1)
+    det2 = np.asarray(det2)
+    half = num_dets_per_ring // 2
+    # tangential position in (-half, half]
+    tangential = half - (det2 - det1) % num_dets_per_ring
+    view = (det1 - (tangential >> 1)) % num_dets_per_ring
+    # views in [half, num_dets_per_ring) are those of the swapped pair
+    swapped = view >= half
+    swapped_tangential = half - (det1 - det2) % num_dets_per_ring
+    swapped_view = (det2 - (swapped_tangential >> 1)) % num_dets_per_ring
+    tangential = np.where(swapped, swapped_tangential, tangential)
+    view = np.where(swapped, swapped_view, view)
+    return view, tangential, swapped
+
+
+class LORMapping(object):
+
+    """
+    Map pairs of detectors (det1, ring1), (det2, ring2) to bins of the projection data.
+    """
+
+    def __init__(self, num_dets_per_ring, num_rings, span, max_diff_ring,
+                 num_views, num_tangential, info):
+        """
+        info: list of pairs (segment, number of axial positions)
+        """
+        if (num_dets_per_ring // 2) % num_views:
+            raise ValueError("The number of views {} does not divide {}"
+                             "".format(num_views, num_dets_per_ring // 2))
+        self.num_dets_per_ring = num_dets_per_ring
+        self.num_rings = num_rings
+        self.span = span
+        self.max_diff_ring = max_diff_ring
+        self.num_views = num_views
+        self.view_mashing = (num_dets_per_ring // 2) // num_views
+        self.num_tangential = num_tangential
+        self.min_tangential = -(num_tangential // 2)
+        self.index = SinogramIndex(info, num_views, num_tangential)
+        self._axial_sizes = dict(info)
+        self._segments = np.array(sorted(self._axial_sizes))
+        self._num_axial = np.array([self._axial_sizes[s] for s in self._segments])
+        # segments with a single ring difference are sampled once per ring, the others twice
+        single = [np.subtract(*self.get_ring_differences(s)) == 0 for s in self._segments]
+        self._increments = np.where(single, 2, 1)
+
+    def get_segment(self, ring_difference):
+        """
+        Segment of ring differences ``ring2 - ring1``.
+        """
+        ring_difference = np.asarray(ring_difference)
+        magnitude = (np.abs(ring_difference) + (self.span - 1) // 2) // self.span
+        return np.sign(ring_difference) * magnitude
+
+    def get_ring_differences(self, segment):
+        """
+        Minimum and maximum ring difference of a segment.
+        """
+        return get_ring_differences(segment, self.span, self.max_diff_ring)
+
+    def get_segment_axial(self, ring1, ring2):
+        """
+        Segment and axial position of ring pairs, and whether they are in the data.
+        """
+        ring1 = np.asarray(ring1)
+        ring2 = np.asarray(ring2)
+        ring_difference = ring2 - ring1
+        segment = self.get_segment(ring_difference)
+        position = np.clip(segment - self._segments[0], 0, len(self._segments) - 1)
+        valid = (np.abs(ring_difference) <= self.max_diff_ring) & (self._segments[position] == segment)
+        num_axial = self._num_axial[position]
+        increment = self._increments[position]
+        offset = self.num_rings - 1 - increment * (num_axial - 1) // 2
+        axial_sum = ring1 + ring2 - offset
+        axial = axial_sum // increment
+        valid &= (axial_sum % increment == 0) & (axial >= 0) & (axial < num_axial)
+        return segment, axial, valid
+
+    def get_bins(self, det1, ring1, det2, ring2):
+        """
+        Segment, axial, view and tangential indices of detector pairs,
+        and a mask of the pairs which are in the data.
+        """
+        det1, ring1, det2, ring2 = np.broadcast_arrays(det1, ring1, det2, ring2)
+        view, tangential, swapped = get_view_tangential(det1, det2, self.num_dets_per_ring)
+        # the ring difference is taken in the order of the detectors of the bin
+        first = np.where(swapped, ring2, ring1)
+        second = np.where(swapped, ring1, ring2)
+        segment, axial, valid = self.get_segment_axial(first, second)
+        view = view // self.view_mashing
+        tangential_index = tangential - self.min_tangential
+        valid &= (det1 != det2) & (tangential_index >= 0) & (tangential_index < self.num_tangential)
+        return segment, axial, view, tangential_index, valid
+
+    def get_indices(self, det1, ring1, det2, ring2):
+        """
+        Flat indices in the projection data of detector pairs
+        (zero for the pairs which are not in the data), and a mask of the valid pairs.
+        """
+        segment, axial, view, tangential, valid = self.get_bins(det1, ring1, det2, ring2)
+        indices = np.zeros(valid.shape, dtype=np.int64)
+        indices[valid] = self.index.ravel(segment[valid], axial[valid], view[valid], tangential[valid])
+        return indices, valid
+
+
+class LORTable(object):
+
+    """
+    Lookup table of the flat indices of detector pairs, factorized in a
+    transaxial table of the (det1, det2) pairs and an axial table of the
+    (ring1, ring2) pairs.
+    """
+
+    def __init__(self, mapping):
+        """
+        mapping: a `LORMapping`
+        """
+        self.size = mapping.index.size
+        self.num_dets_per_ring = num_dets = mapping.num_dets_per_ring
+        self.num_rings = num_rings = mapping.num_rings
+        det1, det2 = np.meshgrid(np.arange(num_dets), np.arange(num_dets), indexing='ij')
+        view, tangential, swapped = get_view_tangential(det1, det2, num_dets)
+        view = view // mapping.view_mashing
+        tangential = tangential - mapping.min_tangential
+        valid = (det1 != det2) & (tangential >= 0) & (tangential < mapping.num_tangential)
+        # position in a sinogram, -1 for the pairs outside the data
+        self.transaxial = np.where(valid, view * mapping.num_tangential + tangential, -1).ravel()
+        # the rings of swapped detectors are looked up in the transposed axial table
+        self.ring_offset = np.where(swapped, num_rings**2, 0).ravel()
+        ring1, ring2 = np.meshgrid(np.arange(num_rings), np.arange(num_rings), indexing='ij')
+        segment, axial, valid = mapping.get_segment_axial(ring1, ring2)
+        sinogram = np.full(valid.shape, -1, dtype=np.int64)
+        sinogram[valid] = mapping.index.get_sinogram(segment[valid], axial[valid])
+        # offset of the sinogram in the flat data, -1 for the pairs outside the data
+        offsets = np.where(valid, sinogram * mapping.num_views * mapping.num_tangential, -1)
+        self.axial = np.concatenate([offsets.ravel(), offsets.T.ravel()])
+
+    def get_indices(self, det1, ring1, det2, ring2):
+        """
+        Flat indices in the projection data of detector pairs
+        (zero for the pairs which are not in the data), and a mask of the valid pairs.
+        Detectors outside the scanner are not in the data.
+        """
+        det1, ring1, det2, ring2 = np.broadcast_arrays(det1, ring1, det2, ring2)
+        # out of range numbers would wrap around or land on other pairs of the tables
+        in_range = ((0 <= det1) & (det1 < self.num_dets_per_ring) & (0 <= det2) & (det2 < self.num_dets_per_ring)
+                    & (0 <= ring1) & (ring1 < self.num_rings) & (0 <= ring2) & (ring2 < self.num_rings))
+        pair = np.multiply(det1, self.num_dets_per_ring, dtype=np.intp)
+        pair += det2
+        pair[~in_range] = 0
+        transaxial = self.transaxial.take(pair)
+        rings = self.ring_offset.take(pair)
+        rings += np.multiply(ring1, self.num_rings, dtype=np.intp)
+        rings += ring2
+        rings[~in_range] = 0
+        axial = self.axial.take(rings)
+        valid = in_range & (transaxial >= 0) & (axial >= 0)
+        axial += transaxial
+        axial[~valid] = 0
+        return axial, valid
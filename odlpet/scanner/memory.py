@@ -0,0 +1,162 @@
+"""
+Estimates of the memory used by the projectors, computed from the geometry only.
+
+The estimates are rough upper bounds in bytes, meant to choose the execution
+parameters of a projection before allocating anything.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+
+FLOAT_BYTES = np.dtype(np.float32).itemsize
+
+
+def estimate_matrix_bytes(num_views, num_tangential, num_segments, volume_shape, symmetry_swap_segment=True):
+    """
+    Rough estimate of the memory of a ray-tracing projection matrix once all its elements are computed.
+
+    Only the bins which are basic for the symmetries are stored, each with at most
+    one element per voxel crossed by the line of response.
+    """
+    num_crossed = sum(volume_shape)
+    if num_views % 4 == 0:
+        num_views //= 4
+    elif num_views % 2 == 0:
+        num_views //= 2
+    num_tangential = (num_tangential + 1) // 2
+    if symmetry_swap_segment:
+        num_segments = num_segments // 2 + 1
+    # axial shifts are symmetries as well: two basic axial positions per segment
+    num_bins = num_views * num_tangential * num_segments * 2
+    # an element has three integer coordinates and a float value
+    return num_bins * num_crossed * 16
+
+
+class MemoryEstimate(namedtuple('MemoryEstimate', [
+        'data', 'volume', 'stir_data', 'stir_volume', 'copies', 'matrix', 'num_workers'])):
+
+    """
+    Estimated bytes of each component of a projection:
+
+    data, volume: NumPy projection data and volume of the caller
+    stir_data, stir_volume: STIR buffers of one worker
+    copies: temporaries of the copies from STIR to NumPy of one worker
+    matrix: projection matrix of one worker
+    num_workers: number of processes, each with its own buffers, copies and matrix,
+    and a copy of the data and volume
+    """
+
+    @property
+    def worker(self):
+        """
+        Bytes used by one worker.
+        """
+        worker = self.stir_data + self.stir_volume + self.copies + self.matrix
+        if self.num_workers > 1:
+            worker += self.data + self.volume
+        return worker
+
+    @property
+    def total(self):
+        return self.data + self.volume + self.num_workers * self.worker
+
+    def as_dict(self):
+        return dict(self._asdict(), total=self.total)
+
+
+def estimate_memory(info, num_views, num_tangential, volume_shape,
+                    num_buffers=1, max_sinograms=None, num_workers=1):
+    """
+    Estimate the memory of a projection.
+
+    info: list of pairs (segment, number of axial positions)
+    volume_shape: shape of the voxel grid
+    num_buffers: number of STIR buffers of the projector (concurrent evaluations)
+    max_sinograms: block size of a streaming projector, or None for a projector holding all the data
+    num_workers: number of processes of a parallel projector
+    """
+    from .sinogram import get_segment_blocks
+    sinogram_bytes = num_views * num_tangential * FLOAT_BYTES
+    num_sinograms = sum(size for (_, size) in info)
+    volume = int(np.prod(volume_shape)) * FLOAT_BYTES
+    data = num_sinograms * sinogram_bytes
+    largest_segment = max(size for (_, size) in info) * sinogram_bytes
+    if max_sinograms is None:
+        stir_data = num_buffers * data
+        stir_volume = num_buffers * volume
+    else:
+        sizes = dict(info)
+        blocks = get_segment_blocks(info, max_sinograms)
+        largest_block = max(sum(sizes[segment] for segment in range(low, high+1)) for (low, high) in blocks)
+        stir_data = largest_block * sinogram_bytes
+        stir_volume = volume
+    # a segment of the projection data, and the back projected volume
+    copies = largest_segment + volume
+    matrix = estimate_matrix_bytes(num_views, num_tangential, len(info), volume_shape,
+                                   symmetry_swap_segment=max_sinograms is None)
+    return MemoryEstimate(data, volume, stir_data, stir_volume, copies, matrix, num_workers)
+
+
+ExecutionPlan = namedtuple('ExecutionPlan', ['max_sinograms', 'num_subsets', 'num_workers', 'estimate'])
+ExecutionPlan.__doc__ = """
+Execution parameters of a projection fitting a memory budget.
+
+max_sinograms: block size of a streaming projector, None if the data fit in memory
+num_subsets: number of subsets of the projection
+num_workers: number of processes of a parallel projector (one for a sequential projector)
+estimate: the `MemoryEstimate` of that execution
+"""
+
+
+def choose_num_subsets(num_views, num_workers):
+    """
+    Smallest number of subsets dividing the views which is a multiple of `num_workers`,
+    so that the subsets have the same size and the workers the same number of subsets.
+    None if there is none.
+    """
+    for num_subsets in range(num_workers, num_views + 1, num_workers):
+        if num_views % num_subsets == 0:
+            return num_subsets
+    return None
+
+def plan_execution(memory_budget, info, num_views, num_tangential, volume_shape,
+                   num_subsets=None, max_workers=1):
+    """
+    Choose execution parameters whose estimated memory fits in `memory_budget` bytes.
+
+    Projectors holding all the data are preferred, with as many workers as fit,
+    up to `max_workers` and the number of subsets (the workers compute subsets).
+    Otherwise, the largest streaming block which fits is chosen.
+    Raises `MemoryError` if even one segment at a time does not fit.
+
+    num_subsets: number of subsets, or None to choose it with `choose_num_subsets`
+    for each number of workers (one subset for a single worker or a streaming projector).
+    The memory does not depend on the number of subsets, which only bounds the number of workers.
+    """
+    for num_workers in range(max(1, max_workers), 0, -1):
+        if num_subsets is None:
+            subsets = choose_num_subsets(num_views, num_workers)
+        else:
+            subsets = num_subsets if num_workers <= max(1, num_subsets) else None
+        if subsets is None:
+            continue
+        estimate = estimate_memory(info, num_views, num_tangential, volume_shape, num_workers=num_workers)
+        if estimate.total <= memory_budget:
+            return ExecutionPlan(None, subsets, num_workers, estimate)
+    if num_subsets is None:
+        num_subsets = 1
+    segment_sizes = sorted({size for (_, size) in info}, reverse=True)
+    max_sinograms = sum(size for (_, size) in info)
+    # blocks are at least one segment, so only block sizes down to the largest segment differ
+    while max_sinograms >= segment_sizes[0]:
+        estimate = estimate_memory(info, num_views, num_tangential, volume_shape,
+                                   max_sinograms=max_sinograms)
+        if estimate.total <= memory_budget:
+            return ExecutionPlan(max_sinograms, num_subsets, 1, estimate)
+        max_sinograms -= segment_sizes[-1]
+    needed = min(estimate_memory(info, num_views, num_tangential, volume_shape).total,
+                 estimate_memory(info, num_views, num_tangential, volume_shape, max_sinograms=0).total)
+    raise MemoryError("No execution fits in {} bytes (at least {} bytes are needed)".format(
+        memory_budget, needed))
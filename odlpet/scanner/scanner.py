@@ -1,4 +1,12 @@
-from stir import Scanner as _Scanner, Succeeded as _Succeeded
+"""
+Scanner geometries, convertible to and from STIR scanners.
+
+The STIR bindings are only imported when first needed.
+"""
+
+import functools
+from collections import namedtuple
+
 import numpy as np
 
 class Scanner:
@@ -26,27 +34,15 @@ class Scanner:
 
     def get_stir_scanner(self):
         """
-        Return a STIR scanner object corresponding to this object.
+        Return a new STIR scanner object corresponding to this object.
         """
+        return self.get_config().get_stir_scanner()
 
-        # TODO: should be moved to proper accessor methods
-        if self.max_num_non_arc_cor_bins is None:
-            # Roughly speaking number of detectors on the diameter
-            # bin_size = (self.det_radius*2) / (self.num_dets_per_ring/2)
-            self.max_num_non_arc_cor_bins = int(self.num_dets_per_ring/2)
-
-        if self.default_non_arc_cor_bins is None:
-            self.default_non_arc_cor_bins = self.max_num_non_arc_cor_bins
-
-        scanner = _get_stir_scanner_by_name('Userdefined')
-
-        for (sa, pa, ty) in ACCESSOR_MAPPING:
-            getattr(scanner, "set_"+sa)(ty(getattr(self, pa)))
-
-        if _check_consistency(scanner):
-            return scanner
-        else:
-            raise ValueError('Something is wrong in the scanner geometry.')
+    def get_config(self):
+        """
+        Frozen `ScannerConfig` of the current attributes.
+        """
+        return ScannerConfig.from_scanner(self)
 
     @classmethod
     def from_stir_scanner(cls, stir_scanner):
@@ -73,18 +69,32 @@ def _get_stir_scanner_by_name(name):
     """
     # if name not in SCANNER_NAMES:
         # raise ValueError("No default scanner of name {}".format(name))
+    from stir import Scanner as _Scanner
     stir_scanner = _Scanner.get_scanner_from_name(name)
     return stir_scanner
 
 def _check_consistency(_scanner):
+    from stir import Succeeded as _Succeeded
     return _scanner.check_consistency() == _Succeeded(_Succeeded.yes)
 
 def _get_scanner_names():
+    from stir import Scanner as _Scanner
     all_names = _Scanner.list_all_names()
     names = [name_.split(',')[0].rstrip() for name_ in all_names.split('\n')[:-1]]
     return names
 
-SCANNER_NAMES = _get_scanner_names()
+@functools.lru_cache(maxsize=None)
+def get_scanner_names():
+    """
+    Names of the scanners known to STIR, computed on first use.
+    """
+    return tuple(_get_scanner_names())
+
+def __getattr__(name):
+    # SCANNER_NAMES is computed lazily
+    if name == 'SCANNER_NAMES':
+        return list(get_scanner_names())
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 # a mapping between STIR and Python accessors, as well as the corresponding type
 ACCESSOR_MAPPING = [
@@ -106,6 +116,61 @@ ACCESSOR_MAPPING = [
     ("num_detector_layers", "num_detector_layers", np.int32),
 ]
 
+
+class ScannerConfig(namedtuple('ScannerConfig', [pa for (_, pa, _) in ACCESSOR_MAPPING])):
+
+    """
+    Immutable and hashable scanner geometry, with the attributes of `Scanner`
+    converted to plain Python numbers of the STIR types.
+
+    The STIR scanner used by the projectors is built once per configuration.
+    """
+
+    @classmethod
+    def from_scanner(cls, scanner):
+        values = {pa: getattr(scanner, pa) for (_, pa, _) in ACCESSOR_MAPPING}
+        # default number of bins: roughly the number of detectors on the diameter
+        if values['max_num_non_arc_cor_bins'] is None:
+            values['max_num_non_arc_cor_bins'] = int(values['num_dets_per_ring']/2)
+        if values['default_non_arc_cor_bins'] is None:
+            values['default_non_arc_cor_bins'] = values['max_num_non_arc_cor_bins']
+        return cls(**{pa: ty(values[pa]).item() for (_, pa, ty) in ACCESSOR_MAPPING})
+
+    def to_scanner(self):
+        """
+        Mutable `Scanner` with the same geometry.
+        """
+        scanner = Scanner()
+        for (pa, value) in self._asdict().items():
+            setattr(scanner, pa, value)
+        return scanner
+
+    def get_stir_scanner(self):
+        """
+        New STIR scanner of this configuration, which the caller may modify.
+        """
+        return _build_stir_scanner(self)
+
+
+@functools.lru_cache(maxsize=64)
+def _get_stir_scanner_from_config(config):
+    """
+    STIR scanner of a configuration, shared by all the callers: it must not be modified.
+    """
+    return _build_stir_scanner(config)
+
+def _build_stir_scanner(config):
+    scanner = _get_stir_scanner_by_name('Userdefined')
+
+    for (sa, pa, ty) in ACCESSOR_MAPPING:
+        getattr(scanner, "set_"+sa)(ty(getattr(config, pa)))
+
+    if _check_consistency(scanner):
+        return scanner
+    else:
+        raise ValueError('Something is wrong in the scanner geometry.')
+
+
 class mCT(Scanner):
     # Detector x size in mm - plus the ring difference
     det_nx_mm = 6.25
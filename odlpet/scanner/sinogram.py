@@ -3,7 +3,6 @@ Utility functions related to sinograms.
 """
 
 import numpy as np
-from odl.discr import uniform_discr
 
 
 def get_segment_offset(segment_, info):
@@ -35,6 +34,153 @@ def get_offset(segment, axial, info):
     seg_offset = get_segment_offset(segment_reordered_(segment), info)
     return seg_offset + axial
 
+class SinogramIndex(object):
+
+    """
+    Vectorized mapping between (segment, axial, view, tangential) indices
+    and flat indices of the data in the layout of `get_range_from_proj_data`.
+
+    The axial, view and tangential indices start at zero.
+    Built once from the segment sizes, it maps whole arrays of indices at once.
+    """
+
+    def __init__(self, info, num_views, num_tangential):
+        """
+        info: list of pairs (segment, number of axial positions)
+        """
+        segments = np.array([segment for (segment, _) in info])
+        sizes = np.array([size for (_, size) in info])
+        # segments in the order of the sinograms: 0, 1, -1, 2, -2, ...
+        order = np.argsort([segment_reordered_(segment) for segment in segments])
+        self.segments = segments[order]
+        self.sizes = sizes[order]
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes)[:-1]])
+        self.min_segment = segments.min()
+        # table of the offsets and sizes by segment number
+        self._segment_offsets = np.zeros(segments.max() - self.min_segment + 1, dtype=int)
+        self._segment_offsets[self.segments - self.min_segment] = self.offsets
+        self._segment_sizes = np.zeros_like(self._segment_offsets)
+        self._segment_sizes[self.segments - self.min_segment] = self.sizes
+        self.shape = (int(self.sizes.sum()), num_views, num_tangential)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    def get_sinogram(self, segment, axial):
+        """
+        Index of the sinograms of given segments and axial positions.
+        """
+        segment = np.asarray(segment)
+        axial = np.asarray(axial)
+        position = segment - self.min_segment
+        valid = (position >= 0) & (position < len(self._segment_sizes))
+        position = np.where(valid, position, 0)
+        sizes = np.where(valid, self._segment_sizes[position], 0)
+        if not np.all(valid & (sizes > 0)):
+            raise ValueError("Segments {} not in {}".format(np.unique(segment[~(valid & (sizes > 0))]), list(self.segments)))
+        if not np.all((0 <= axial) & (axial < sizes)):
+            raise ValueError("Axial offset violation: 0 <= axial < {}".format(dict(zip(self.segments, self.sizes))))
+        return self._segment_offsets[position] + axial
+
+    def ravel(self, segment, axial, view, tangential):
+        """
+        Flat indices of the given bins.
+        """
+        sinogram = self.get_sinogram(segment, axial)
+        return np.ravel_multi_index((sinogram, view, tangential), self.shape)
+
+    def unravel(self, index):
+        """
+        Segment, axial, view and tangential indices of flat indices.
+        """
+        sinogram, view, tangential = np.unravel_index(index, self.shape)
+        sorted_offsets = np.argsort(self.offsets)
+        position = sorted_offsets[np.searchsorted(self.offsets[sorted_offsets], sinogram, side='right') - 1]
+        segment = self.segments[position]
+        axial = sinogram - self.offsets[position]
+        return segment, axial, view, tangential
+
+def get_related_views(view, num_views, symmetry_90=True, symmetry_180=True):
+    """
+    Views obtained from `view` by the symmetries phi -> 90-phi and phi -> 180-phi
+    of the projection matrix.
+
+    The symmetries are only used by STIR when the number of views is
+    divisible by four (resp. two).
+    """
+    views = {view}
+    if symmetry_180 and num_views % 2 == 0:
+        views.add((num_views - view) % num_views)
+        if symmetry_90 and num_views % 4 == 0:
+            views.add((num_views//2 - view) % num_views)
+            views.add((num_views//2 + view) % num_views)
+    return sorted(views)
+
+def get_basic_views(num_views, symmetry_90=True, symmetry_180=True):
+    """
+    Views from which all the other ones are obtained by symmetry.
+    """
+    if symmetry_180 and num_views % 2 == 0:
+        if symmetry_90 and num_views % 4 == 0:
+            return list(range(num_views//4 + 1))
+        return list(range(num_views//2 + 1))
+    return list(range(num_views))
+
+def get_subset_views(num_views, subset_num, num_subsets, symmetry_90=True, symmetry_180=True):
+    """
+    Indices of the views projected by STIR for a given subset.
+
+    STIR projects the basic views equal to `subset_num` modulo `num_subsets`,
+    together with all their related views.
+    """
+    basic_views = get_basic_views(num_views, symmetry_90, symmetry_180)
+    views = [related
+             for view in basic_views if view % num_subsets == subset_num
+             for related in get_related_views(view, num_views, symmetry_90, symmetry_180)]
+    return np.array(sorted(set(views)), dtype=int)
+
+def get_subset_view_mask(num_views, subset_num, num_subsets, symmetry_90=True, symmetry_180=True):
+    """
+    Boolean mask of the views projected by STIR for a given subset.
+    """
+    mask = np.zeros(num_views, dtype=bool)
+    mask[get_subset_views(num_views, subset_num, num_subsets, symmetry_90, symmetry_180)] = True
+    return mask
+
+def get_sinogram_info(proj_data_info):
+    """
+    List of pairs (segment, number of axial positions) of a STIR projection data info.
+    """
+    segments = range(proj_data_info.get_min_segment_num(), proj_data_info.get_max_segment_num()+1)
+    return [(s, proj_data_info.get_max_axial_pos_num(s)+1 - proj_data_info.get_min_axial_pos_num(s))
+            for s in segments]
+
+def get_segment_blocks(info, max_sinograms=None):
+    """
+    Split the segments in blocks of consecutive segment numbers,
+    with at most `max_sinograms` sinograms in each block
+    (unless a single segment is larger).
+
+    info: list of pairs (segment, number of axial positions)
+    Returns a list of pairs (min_segment, max_segment).
+    """
+    sizes = dict(info)
+    # the positive and the negative segments are grouped separately
+    sides = [sorted(s for s in sizes if s >= 0), sorted((s for s in sizes if s < 0), reverse=True)]
+    blocks = []
+    for side in sides:
+        block = []
+        for segment in side:
+            num_sinograms = sum(sizes[s] for s in block) + sizes[segment]
+            if block and max_sinograms is not None and num_sinograms > max_sinograms:
+                blocks.append((min(block), max(block)))
+                block = []
+            block.append(segment)
+        if block:
+            blocks.append((min(block), max(block)))
+    return blocks
+
 def get_shape_from_proj_data(proj_data):
     """
     Get shape from proj_data without converting to an array.
@@ -47,13 +193,20 @@ def get_shape_from_proj_data(proj_data):
 
 def get_range_from_proj_data(proj_data, radius=1.):
     """
-    Get an ODL codomain (range) from the projection data.
+    Get an ODL codomain (range) from the projection data (or projection data info).
 
     The second coordinate is an angle.
     The last one is a tangential coordinate, normalised between -1 and 1.
     `radius`: units for the tangential coordinates
     """
-    shape = get_shape_from_proj_data(proj_data)
+    return get_range_from_shape(get_shape_from_proj_data(proj_data), radius=radius)
+
+def get_range_from_shape(shape, radius=1.):
+    """
+    ODL codomain (range) of projection data of shape (sinograms, views, tangential positions).
+    See `get_range_from_proj_data`.
+    """
+    from odl.discr import uniform_discr
     min_pt = [0, 0, -radius]
     max_pt = [shape[0], np.pi, radius]
     data_sp = uniform_discr(min_pt=min_pt,
@@ -0,0 +1,96 @@
+"""
+Projection of stacks of volumes, for instance the frames of a dynamic study.
+
+The frames are projected concurrently on a thread pool.
+They all use the same set-up STIR projector, each evaluation checking out its own
+STIR buffers from the pool of the projector.
+Note that the frames only run in parallel if the STIR bindings release the GIL.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from odl.operator import Operator
+from odl import ProductSpace
+
+
+class _BatchProjectorBase(Operator):
+
+    def __init__(self, projector, domain, range, frame_operator, num_workers=None):
+        """
+        projector: a `ForwardProjectorByBinWrapper`
+        frame_operator: operator applied to each frame
+        num_workers: number of threads (default: number of frames, at most the number of CPUs
+        and the size of the buffer pool of the projector)
+        """
+        super().__init__(domain, range, linear=True)
+        self.projector = projector
+        self.frame_operator = frame_operator
+        if num_workers is None:
+            # each thread holds STIR buffers of the pool, which may be bounded
+            num_workers = min(len(domain), os.cpu_count() or 1)
+            if projector.pool.max_size is not None:
+                num_workers = min(num_workers, projector.pool.max_size)
+        self.num_workers = num_workers
+
+    def _call(self, x, out):
+        def call_frame(i):
+            self.frame_operator(x[i], out=out[i])
+        # the threads only live during the call
+        with ThreadPoolExecutor(self.num_workers) as executor:
+            # consume the results to propagate exceptions
+            list(executor.map(call_frame, range(len(x))))
+
+
+class BatchForwardProjector(_BatchProjectorBase):
+
+    """
+    Forward projection of a stack of volumes.
+
+    Elements of the domain may be created from (frames, z, y, x) arrays.
+    """
+
+    def __init__(self, projector, num_frames, num_workers=None, adjoint=None):
+        """
+        projector: a `ForwardProjectorByBinWrapper`
+        num_frames: number of volumes in the stack
+        num_workers: number of threads (default: number of frames, at most the number of CPUs
+        and the size of the buffer pool of the projector)
+        """
+        super().__init__(projector,
+                         ProductSpace(projector.domain, num_frames),
+                         ProductSpace(projector.range, num_frames),
+                         projector, num_workers)
+        if adjoint is None:
+            adjoint = BatchBackProjector(projector, num_frames, num_workers, adjoint=self)
+        self._adjoint = adjoint
+
+    @property
+    def adjoint(self):
+        return self._adjoint
+
+
+class BatchBackProjector(_BatchProjectorBase):
+
+    """
+    Back projection of a stack of projection data.
+    """
+
+    def __init__(self, projector, num_frames, num_workers=None, adjoint=None):
+        """
+        projector: a `ForwardProjectorByBinWrapper`, whose adjoint is used
+        num_frames: number of projection data in the stack
+        num_workers: number of threads (default: number of frames, at most the number of CPUs
+        and the size of the buffer pool of the projector)
+        """
+        super().__init__(projector,
+                         ProductSpace(projector.range, num_frames),
+                         ProductSpace(projector.domain, num_frames),
+                         projector.adjoint, num_workers)
+        if adjoint is None:
+            adjoint = BatchForwardProjector(projector, num_frames, num_workers, adjoint=self)
+        self._adjoint = adjoint
+
+    @property
+    def adjoint(self):
+        return self._adjoint
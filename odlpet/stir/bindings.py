@@ -24,14 +24,20 @@ the STIR classes used here.
 .. _STIR doc: http://stir.sourceforge.net/documentation/doxy/html/
 """
 
+import time
+
 from stirextra import to_numpy
 from stir import (
+    ProjData,
     ProjMatrixByBinUsingRayTracing,
     ForwardProjectorByBinUsingProjMatrixByBin,
     BackProjectorByBinUsingProjMatrixByBin,
 )
 
 from ..scanner.sinogram import get_shape_from_proj_data
+from .pool import BufferPool
+from ..utils import profiling
+from ..utils.profiling import timed
 
 from odl.operator import Operator
 
@@ -51,7 +57,8 @@ class ForwardProjectorByBinWrapper(Operator):
                  _proj_info=None,
                  subset_num=0, num_subsets=1,
                  restrict_to_cylindrical_FOV=True,
-                 projector=None, adjoint=None):
+                 projector=None, adjoint=None, back_projector=None,
+                 pool=None, max_buffers=None):
         """Initialize a new instance.
 
         Parameters
@@ -70,6 +77,15 @@ class ForwardProjectorByBinWrapper(Operator):
             A pre-initialized projector.
         adjoint : `BackProjectorByBinWrapper`, optional
             A pre-initialized adjoint.
+        back_projector : ``stir.BackProjectorByBin``, optional
+            A pre-initialized back-projector, used to create the adjoint
+            when ``projector`` is given.
+        pool : `BufferPool`, optional
+            Pool of STIR buffers, shared with the adjoint.
+            By default, a new pool is created from ``volume`` and ``proj_data``.
+        max_buffers : int, optional
+            Maximum number of buffers of a new pool, that is, of concurrent
+            evaluations. Unbounded by default.
         """
         # Check data sizes
         if domain.shape != volume.shape():
@@ -94,58 +110,41 @@ class ForwardProjectorByBinWrapper(Operator):
             self.proj_data_info = _proj_info
         self.volume = volume
 
-        # Create forward projection by matrix
-        if projector is None:
-            self.proj_matrix = ProjMatrixByBinUsingRayTracing()
-            self.proj_matrix.set_do_symmetry_90degrees_min_phi(True)
-            self.proj_matrix.set_do_symmetry_180degrees_min_phi(True)
-            self.proj_matrix.set_do_symmetry_swap_s(True)
-            self.proj_matrix.set_do_symmetry_swap_segment(True)
-            self.proj_matrix.set_num_tangential_LORs(np.int32(1))
-
-            self.proj_matrix.set_up(self.proj_data_info, self.volume)
-
-            self.proj_matrix.set_restrict_to_cylindrical_FOV(restrict_to_cylindrical_FOV)
-
+        # Each evaluation checks out its own buffers, so that concurrent
+        # evaluations do not overwrite each other
+        if pool is None:
+            pool = BufferPool(volume, proj_data, max_size=max_buffers)
+        self.pool = pool
 
-            self.projector = ForwardProjectorByBinUsingProjMatrixByBin(self.proj_matrix)
-
-            self.projector.set_up(self.proj_data_info, self.volume)
-
-            # If no adjoint was given, we initialize a projector here to
-            # save time.
-            if adjoint is None:
-                back_projector = BackProjectorByBinUsingProjMatrixByBin(
-                    self.proj_matrix)
-                back_projector.set_up(self.proj_data_info,
-                                       self.volume)
+        # Create forward projection by matrix, shared with the other operators of the same geometry
+        if projector is None:
+            from .registry import get_projectors
+            self.projector, back_projector = get_projectors(
+                self.proj_data_info, self.volume,
+                restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV)
         else:
             # If user wants to provide both a projector and a back-projector,
-            # he should wrap the back projector in an Operator
+            # he should pass the back projector as well, or wrap it in an Operator
             self.projector = projector
-            back_projector = None
 
         # Pre-create an adjoint to save time
         if adjoint is None:
             self._adjoint = BackProjectorByBinWrapper(
                 self.range, self.domain, self.volume, self.proj_data,
                 subset_num=subset_num, num_subsets=num_subsets,
-                back_projector=back_projector, adjoint=self)
+                restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV,
+                back_projector=back_projector, adjoint=self, pool=self.pool)
         else:
             self._adjoint = adjoint
 
     def _call(self, volume, out):
         """Forward project a volume."""
-        # Set volume data
-        self.volume.fill(volume.asarray().flat)
-
-        # project
-        res = call_with_stir_buffer(
-            self.projector.forward_project, self.volume, self.proj_data, volume,
-            self.subset_num, self.num_subsets)
-
-        # make ODL data
-        out[:] = res
+        # the projection data may be shared with other subsets, so clear it
+        with self.pool.checkout() as (stir_volume, stir_proj_data):
+            call_with_stir_buffer(
+                self.projector.forward_project, stir_volume, stir_proj_data, volume,
+                self.subset_num, self.num_subsets,
+                clear_buffer=True, out=out.asarray(), phase='forward')
 
     @property
     def adjoint(self):
@@ -159,7 +158,8 @@ class BackProjectorByBinWrapper(Operator):
 
     def __init__(self, domain, range, volume, proj_data,
                  subset_num=0, num_subsets=1,
-                 back_projector=None, adjoint=None):
+                 restrict_to_cylindrical_FOV=True,
+                 back_projector=None, adjoint=None, pool=None, max_buffers=None):
         """Initialize a new instance.
 
         Parameters
@@ -174,10 +174,17 @@ class BackProjectorByBinWrapper(Operator):
             Stir volume to use in the forward projection
         proj_data : ``stir.ProjData``
             Stir description of the projection.
+        restrict_to_cylindrical_FOV : bool, optional
+            Whether the projection matrix is restricted to the cylindrical
+            field of view, when no ``back_projector`` is given.
         back_projector : ``stir.BackProjectorByBin``, optional
             A pre-initialized back-projector.
         adjoint : `ForwardProjectorByBinWrapper`, optional
             A pre-initialized adjoint.
+        pool : `BufferPool`, optional
+            Pool of STIR buffers, shared with the adjoint.
+        max_buffers : int, optional
+            Maximum number of buffers of a new pool.
 
         Notes
         -----
@@ -207,20 +214,16 @@ class BackProjectorByBinWrapper(Operator):
         self.proj_data_info = proj_data.get_proj_data_info()
         self.volume = volume
 
-        # Create forward projection by matrix
-        if back_projector is None:
-            proj_matrix = ProjMatrixByBinUsingRayTracing()
-
-            self.back_projector = BackProjectorByBinUsingProjMatrixByBin(
-                proj_matrix)
-            self.back_projector.set_up(self.proj_data.get_proj_data_info(),
-                                       self.volume)
-
-            if adjoint is None:
-                projector = ForwardProjectorByBinUsingProjMatrixByBin(
-                    proj_matrix)
-                projector.set_up(self.proj_data_info, self.volume)
+        if pool is None:
+            pool = BufferPool(volume, proj_data, max_size=max_buffers)
+        self.pool = pool
 
+        # Create back projection by matrix, shared with the other operators of the same geometry
+        if back_projector is None:
+            from .registry import get_projectors
+            projector, self.back_projector = get_projectors(
+                self.proj_data_info, self.volume,
+                restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV)
         else:
             self.back_projector = back_projector
             projector = None
@@ -229,19 +232,19 @@ class BackProjectorByBinWrapper(Operator):
         if adjoint is None:
             self._adjoint = ForwardProjectorByBinWrapper(
                 self.range, self.domain, self.volume, self.proj_data,
-                projector, self)
+                subset_num=subset_num, num_subsets=num_subsets,
+                restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV,
+                projector=projector, adjoint=self, pool=self.pool)
         else:
             self._adjoint = adjoint
 
     def _call(self, projections, out):
         """Back project."""
-        res = call_with_stir_buffer(
-            self.back_projector.back_project, self.proj_data, self.volume, projections,
-            self.subset_num, self.num_subsets,
-            clear_buffer=True)
-
-        # make ODL data
-        out[:] = res
+        with self.pool.checkout() as (stir_volume, stir_proj_data):
+            call_with_stir_buffer(
+                self.back_projector.back_project, stir_proj_data, stir_volume, projections,
+                self.subset_num, self.num_subsets,
+                clear_buffer=True, out=out.asarray(), phase='back')
 
     @property
     def adjoint(self):
@@ -249,12 +252,129 @@ class BackProjectorByBinWrapper(Operator):
         return self._adjoint
 
 
-def call_with_stir_buffer(function, b_in, b_out, v_in, subset_num=0, num_subsets=1, clear_buffer=False):
-    b_in.fill(v_in.asarray().flat)
+def get_proj_matrix(proj_data_info, volume, restrict_to_cylindrical_FOV=True, symmetry_swap_segment=True):
+    """
+    Return a set-up ray-tracing projection matrix using all the symmetries.
+
+    symmetry_swap_segment: whether to use the symmetry between segments of opposite signs,
+    which should be disabled to project ranges of segments which are not symmetric
+    """
+    proj_matrix = ProjMatrixByBinUsingRayTracing()
+    proj_matrix.set_do_symmetry_90degrees_min_phi(True)
+    proj_matrix.set_do_symmetry_180degrees_min_phi(True)
+    proj_matrix.set_do_symmetry_swap_s(True)
+    proj_matrix.set_do_symmetry_swap_segment(symmetry_swap_segment)
+    proj_matrix.set_num_tangential_LORs(np.int32(1))
+
+    proj_matrix.set_up(proj_data_info, volume)
+
+    proj_matrix.set_restrict_to_cylindrical_FOV(restrict_to_cylindrical_FOV)
+    return proj_matrix
+
+def get_stir_projectors(proj_data_info, volume, restrict_to_cylindrical_FOV=True, symmetry_swap_segment=True):
+    """
+    Return a set-up STIR projector and back-projector sharing the same projection matrix.
+
+    These may be shared by all the subset operators of the same geometry.
+    """
+    proj_matrix = get_proj_matrix(proj_data_info, volume,
+                                  restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV,
+                                  symmetry_swap_segment=symmetry_swap_segment)
+    projector = ForwardProjectorByBinUsingProjMatrixByBin(proj_matrix)
+    projector.set_up(proj_data_info, volume)
+    back_projector = BackProjectorByBinUsingProjMatrixByBin(proj_matrix)
+    back_projector.set_up(proj_data_info, volume)
+    return projector, back_projector
+
+def get_sinogram_segments(proj_data_info):
+    """
+    Segment numbers in the order of the sinograms: 0, 1, -1, 2, -2, ...
+    """
+    max_segment = proj_data_info.get_max_segment_num()
+    segments = [0]
+    for segment in range(1, max_segment+1):
+        segments.extend([segment, -segment])
+    return segments
+
+# whether the bindings can fill each STIR type directly from a NumPy array, probed on first use
+_FILL_FROM_ARRAY = {}
+
+def fill_stir_buffer(stir_buffer, array):
+    """
+    Fill a STIR object from an array, seen as contiguous float32 memory.
+
+    Bindings which cannot read a NumPy array directly are given
+    an iterator over that contiguous memory instead.
+    """
+    data = np.ascontiguousarray(array, dtype=np.float32)
+    buffer_type = type(stir_buffer)
+    supported = _FILL_FROM_ARRAY.get(buffer_type)
+    if supported is None:
+        try:
+            stir_buffer.fill(data)
+        except (TypeError, ValueError, RuntimeError, NotImplementedError):
+            supported = _FILL_FROM_ARRAY[buffer_type] = False
+        else:
+            _FILL_FROM_ARRAY[buffer_type] = True
+            return
+    if supported:
+        stir_buffer.fill(data)
+    else:
+        stir_buffer.fill(data.flat)
+
+def copy_stir_buffer(stir_buffer, out):
+    """
+    Copy a STIR object into the preallocated array `out`.
+
+    Projection data are copied one segment at a time, and volumes one plane
+    at a time, so the only temporary is the size of a segment or a plane.
+    """
+    if isinstance(stir_buffer, ProjData):
+        proj_data_info = stir_buffer.get_proj_data_info()
+        offset = 0
+        for segment in get_sinogram_segments(proj_data_info):
+            segment_data = to_numpy(stir_buffer.get_segment_by_sinogram(segment))
+            out[offset:offset+len(segment_data)] = segment_data
+            offset += len(segment_data)
+    else:
+        min_z = stir_buffer.get_min_indices()[1]
+        for (i, z) in enumerate(range(min_z, stir_buffer.get_max_indices()[1]+1)):
+            out[i] = to_numpy(stir_buffer[z])
+    return out
+
+def call_with_stir_buffer(function, b_in, b_out, v_in, subset_num=0, num_subsets=1, clear_buffer=False, out=None,
+                          phase='project'):
+    """
+    Fill `b_in` with `v_in`, apply `function` and copy `b_out` into `out`.
+
+    If `out` is None, a new array is returned.
+    Within a `Profile` context, the steps are recorded as phases prefixed by `phase`.
+    """
+    stats = profiling.ACTIVE
+    if stats is not None:
+        return _profiled_call_with_stir_buffer(stats, phase, function, b_in, b_out, v_in,
+                                               subset_num, num_subsets, clear_buffer, out)
+    fill_stir_buffer(b_in, v_in.asarray())
     if clear_buffer:
         b_out.fill(0)
     function(b_out, b_in, subset_num, num_subsets)
-    return to_numpy(b_out)
+    if out is None:
+        return to_numpy(b_out)
+    return copy_stir_buffer(b_out, out)
+
+def _profiled_call_with_stir_buffer(stats, phase, function, b_in, b_out, v_in,
+                                    subset_num, num_subsets, clear_buffer, out):
+    array = v_in.asarray()
+    timed(stats, phase + '.fill', array.nbytes, fill_stir_buffer, b_in, array)
+    if clear_buffer:
+        timed(stats, phase + '.clear', 0, b_out.fill, 0)
+    timed(stats, phase + '.stir', 0, function, b_out, b_in, subset_num, num_subsets)
+    if out is None:
+        start = time.perf_counter()
+        result = to_numpy(b_out)
+        stats.add(phase + '.copy', time.perf_counter() - start, result.nbytes)
+        return result
+    return timed(stats, phase + '.copy', out.nbytes, copy_stir_buffer, b_out, out)
 
 def get_view_mask(forward_operator):
     """
@@ -2,6 +2,7 @@ from stirextra import to_numpy
 from stir import ProjData as _ProjData, FloatVoxelsOnCartesianGrid
 from ..scanner.compression import Compression
 from .space import space_from_stir_domain
+from ..utils.interfile import InterfileProjData
 
 
 def stir_domain_from_file(volume_file):
@@ -29,6 +30,13 @@ def _proj_data_info_from_file(projection_file):
     proj_data_info = proj_data.get_proj_data_info()
     return proj_data_info
 
+def proj_data_from_file(projection_file, mode='r'):
+    """
+    Memory mapped projection data from an Interfile header, read without STIR.
+    See `InterfileProjData`.
+    """
+    return InterfileProjData(projection_file, mode=mode)
+
 def projector_from_file(volume_file, projection_file):
     """
     Convenience function to create a projector from a volume and projection
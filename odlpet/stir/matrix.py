@@ -0,0 +1,139 @@
+"""
+Sparse representation of the STIR projection matrix, cached on disk.
+
+The ray-tracing matrix is described by CSR arrays (``data``, ``indices``, ``indptr``, ``shape``):
+rows are ordered as the data in `get_range_from_proj_data`,
+columns as the flattened (z, y, x) voxels of `space_from_stir_domain`.
+"""
+
+import numpy as np
+from stir import Bin, ProjMatrixElemsForOneBin
+
+from .bindings import get_proj_matrix, get_sinogram_segments
+from ..scanner.scanner import Scanner, ACCESSOR_MAPPING
+from ..utils.cache import DiskCache, hash_key
+
+
+def _domain_description(stir_domain):
+    min_indices = stir_domain.get_min_indices()
+    max_indices = stir_domain.get_max_indices()
+    voxel_size = stir_domain.get_voxel_size()
+    origin = stir_domain.get_origin()
+    return tuple(
+        (int(min_indices[i]), int(max_indices[i]), float(voxel_size[i]), float(origin[i]))
+        for i in [1, 2, 3])
+
+def _proj_data_info_description(proj_data_info):
+    scanner = Scanner.from_stir_scanner(proj_data_info.get_scanner())
+    scanner_desc = tuple((pa, ty(getattr(scanner, pa)).item()) for (_, pa, ty) in ACCESSOR_MAPPING)
+    segments = tuple(
+        (s, int(proj_data_info.get_min_axial_pos_num(s)), int(proj_data_info.get_max_axial_pos_num(s)))
+        for s in range(proj_data_info.get_min_segment_num(), proj_data_info.get_max_segment_num()+1))
+    return (scanner_desc, segments,
+            int(proj_data_info.get_num_views()),
+            int(proj_data_info.get_num_tangential_poss()))
+
+def geometry_key(proj_data_info, stir_domain, *extra):
+    """
+    Hash of the scanner, sinogram layout and voxel grid.
+
+    `extra` should contain any other setting the result depends on,
+    for instance the compression settings.
+    """
+    return hash_key(_proj_data_info_description(proj_data_info),
+                    _domain_description(stir_domain),
+                    extra)
+
+def _domain_shape(stir_domain):
+    min_indices = stir_domain.get_min_indices()
+    max_indices = stir_domain.get_max_indices()
+    mins = tuple(int(min_indices[i]) for i in [1, 2, 3])
+    vox_shape = tuple(int(max_indices[i] - min_indices[i] + 1) for i in [1, 2, 3])
+    return mins, vox_shape
+
+def get_matrix_rows(proj_matrix, bins, stir_domain):
+    """
+    CSR arrays of the rows of a set-up STIR projection matrix for the given bins.
+
+    bins: iterable of STIR numbers (segment, axial, view, tangential), one per row
+    """
+    (min_z, min_y, min_x), vox_shape = _domain_shape(stir_domain)
+    stride_z, stride_y = vox_shape[1] * vox_shape[2], vox_shape[2]
+
+    elems = ProjMatrixElemsForOneBin()
+    data = []
+    indices = []
+    row_sizes = []
+    # plain Python numbers in the inner loop: it runs once per matrix element
+    for (segment, axial, view, tang) in bins:
+        elems.erase()
+        proj_matrix.get_proj_matrix_elems_for_one_bin(elems, Bin(segment, view, axial, tang))
+        size = len(indices)
+        for elem in elems:
+            coords = elem.get_coords()
+            indices.append((coords[1] - min_z) * stride_z + (coords[2] - min_y) * stride_y
+                           + coords[3] - min_x)
+            data.append(elem.get_value())
+        row_sizes.append(len(indices) - size)
+
+    indptr = np.zeros(len(row_sizes)+1, dtype=np.int64)
+    np.cumsum(row_sizes, out=indptr[1:])
+    shape = np.array([len(row_sizes), np.prod(vox_shape)], dtype=np.int64)
+    return {
+        'data': np.array(data, dtype=np.float32),
+        'indices': np.array(indices, dtype=np.int32),
+        'indptr': indptr,
+        'shape': shape,
+    }
+
+def get_bin_numbers(proj_data_info, segment, axial, view, tangential):
+    """
+    STIR numbers (segment, axial, view, tangential) of bins given by indices
+    starting at zero, as returned by `SinogramIndex.unravel`.
+    """
+    min_view = int(proj_data_info.get_min_view_num())
+    min_tang = int(proj_data_info.get_min_tangential_pos_num())
+    min_axial = {}
+    for (s, a, v, t) in zip(segment.tolist(), axial.tolist(), view.tolist(), tangential.tolist()):
+        if s not in min_axial:
+            min_axial[s] = int(proj_data_info.get_min_axial_pos_num(s))
+        yield (s, a + min_axial[s], v + min_view, t + min_tang)
+
+def get_matrix_data(proj_matrix, proj_data_info, stir_domain):
+    """
+    Extract the CSR arrays of a set-up STIR projection matrix.
+
+    Every bin is visited once through the bindings, so this is slower than setting up
+    the STIR matrix, but only needs to be done once per geometry: the projectors
+    of `Compression.get_projector` with ``backend='sparse'`` then read the matrix
+    from the cache and never set up STIR.
+    """
+    views = range(proj_data_info.get_min_view_num(), proj_data_info.get_max_view_num()+1)
+    tangs = range(proj_data_info.get_min_tangential_pos_num(), proj_data_info.get_max_tangential_pos_num()+1)
+    bins = ((segment, axial, view, tang)
+            for segment in get_sinogram_segments(proj_data_info)
+            for axial in range(proj_data_info.get_min_axial_pos_num(segment),
+                               proj_data_info.get_max_axial_pos_num(segment)+1)
+            for view in views
+            for tang in tangs)
+    return get_matrix_rows(proj_matrix, bins, stir_domain)
+
+def get_cached_matrix_data(proj_data_info, stir_domain, restrict_to_cylindrical_FOV=True,
+                           cache=None, extra_key=(), compute=True):
+    """
+    Return the CSR arrays of the ray-tracing matrix, computing them only
+    if they are not in the disk cache yet.
+
+    cache: a `DiskCache` (default cache directory if None)
+    compute: if False, return None instead of computing a matrix which is not in the cache
+    """
+    if cache is None:
+        cache = DiskCache()
+    key = geometry_key(proj_data_info, stir_domain, bool(restrict_to_cylindrical_FOV), *extra_key)
+    arrays = cache.get(key)
+    if arrays is None and compute:
+        proj_matrix = get_proj_matrix(proj_data_info, stir_domain,
+                                      restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV)
+        arrays = get_matrix_data(proj_matrix, proj_data_info, stir_domain)
+        cache.put(key, **arrays)
+    return arrays
@@ -0,0 +1,177 @@
+"""
+Projection split across subsets and computed on a pool of processes.
+
+Each worker process rebuilds the subset projectors once from a small picklable
+`ProjectorSpec`. Volumes and projection data are exchanged through shared memory,
+not pickled.
+"""
+
+import multiprocessing
+import os
+import weakref
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+from odl.operator import Operator
+
+from .space import space_from_stir_domain
+from ..scanner.sinogram import get_range_from_proj_data, get_subset_views
+
+
+class ProjectorSpec(namedtuple('ProjectorSpec', [
+        'compression', 'num_subsets', 'zoom', 'sizes', 'offset', 'restrict_to_cylindrical_FOV'])):
+
+    """
+    Picklable description of the subset projectors of a `Compression`.
+    """
+
+    def get_stir_domain(self):
+        return self.compression.get_stir_domain(zoom=self.zoom, sizes=self.sizes, offset=self.offset)
+
+    def get_projectors(self):
+        projs, _ = self.compression.get_projectors(
+            num_subsets=self.num_subsets,
+            stir_domain=self.get_stir_domain(),
+            restrict_to_cylindrical_FOV=self.restrict_to_cylindrical_FOV)
+        return projs
+
+
+# subset projectors of the current worker process
+_WORKER_PROJECTORS = None
+# index of the current worker process, between 0 and the number of workers
+_WORKER_SLOT = None
+
+def _init_worker(spec, slots):
+    global _WORKER_PROJECTORS, _WORKER_SLOT
+    _WORKER_PROJECTORS = spec.get_projectors()
+    _WORKER_SLOT = slots.get()
+
+@contextmanager
+def _attached(name, shape):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        yield np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    finally:
+        shm.close()
+
+@contextmanager
+def _shared_array(shape):
+    size = int(np.prod(shape)) * np.dtype(np.float32).itemsize
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        yield shm.name, np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    finally:
+        shm.close()
+        shm.unlink()
+
+def _forward_subset(subset_num, in_name, in_shape, out_name, out_shape):
+    proj = _WORKER_PROJECTORS[subset_num]
+    with _attached(in_name, in_shape) as volume:
+        result = proj(volume)
+    views = get_subset_views(out_shape[1], subset_num, len(_WORKER_PROJECTORS))
+    # the subsets have disjoint views, so the workers do not write at the same place
+    with _attached(out_name, out_shape) as data:
+        data[:, views, :] = result.asarray()[:, views, :]
+
+def _back_subset(subset_num, in_name, in_shape, out_name, out_shape):
+    proj = _WORKER_PROJECTORS[subset_num]
+    with _attached(in_name, in_shape) as data:
+        result = proj.adjoint(data)
+    # each worker accumulates its subsets into its own partial volume
+    with _attached(out_name, out_shape) as volumes:
+        volumes[_WORKER_SLOT] += result.asarray()
+
+
+class _ParallelProjectorBase(Operator):
+
+    def __init__(self, domain, range, spec, executor):
+        super().__init__(domain, range, linear=True)
+        self.spec = spec
+        self.executor = executor
+
+    @contextmanager
+    def _run(self, function, x, out_shape):
+        """
+        Run `function` on every subset, and yield the shared output array.
+        """
+        with _shared_array(x.shape) as (in_name, x_shared):
+            x_shared[:] = x.asarray()
+            with _shared_array(out_shape) as (out_name, out_shared):
+                out_shared.fill(0)
+                futures = [self.executor.submit(function, subset_num, in_name, x.shape, out_name, out_shape)
+                           for subset_num in range(self.spec.num_subsets)]
+                for future in futures:
+                    future.result()
+                yield out_shared
+
+
+class ParallelForwardProjector(_ParallelProjectorBase):
+
+    """
+    Forward projector computing the subset projections on a pool of processes.
+    """
+
+    def __init__(self, spec, num_workers=None):
+        """
+        spec: a `ProjectorSpec`
+        num_workers: number of processes (default: number of CPUs)
+
+        The processes are stopped by `shutdown`, at the end of a ``with`` block,
+        or when the projector is garbage collected.
+        """
+        stir_domain = spec.get_stir_domain()
+        recon_sp = space_from_stir_domain(stir_domain)
+        data_sp = get_range_from_proj_data(spec.compression.get_stir_proj_data(),
+                                           radius=spec.compression.scanner.det_radius)
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        self.num_workers = num_workers
+        slots = multiprocessing.Queue()
+        for slot in range(num_workers):
+            slots.put(slot)
+        executor = ProcessPoolExecutor(num_workers, initializer=_init_worker, initargs=(spec, slots))
+        super().__init__(recon_sp, data_sp, spec, executor)
+        self._finalizer = weakref.finalize(self, executor.shutdown)
+        self._adjoint = ParallelBackProjector(self)
+
+    def _call(self, volume, out):
+        with self._run(_forward_subset, volume, self.range.shape) as data:
+            out[:] = data
+
+    @property
+    def adjoint(self):
+        return self._adjoint
+
+    def shutdown(self):
+        """
+        Stop the worker processes.
+        """
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.shutdown()
+
+
+class ParallelBackProjector(_ParallelProjectorBase):
+
+    """
+    Back projector summing the subset back projections computed on a pool of processes.
+    """
+
+    def __init__(self, forward):
+        super().__init__(forward.range, forward.domain, forward.spec, forward.executor)
+        self._adjoint = forward
+
+    def _call(self, data, out):
+        with self._run(_back_subset, data, (self._adjoint.num_workers,) + self.range.shape) as volumes:
+            np.sum(volumes, axis=0, out=out.asarray())
+
+    @property
+    def adjoint(self):
+        return self._adjoint
@@ -0,0 +1,88 @@
+"""
+Pool of STIR buffers, to make projectors safe to call from several threads.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from stir import FloatVoxelsOnCartesianGrid, ProjDataInMemory
+
+
+def empty_volume_like(volume):
+    """
+    New zero STIR volume with the same geometry as `volume`.
+    """
+    return FloatVoxelsOnCartesianGrid(volume.get_index_range(), volume.get_origin(), volume.get_voxel_size())
+
+def empty_proj_data_like(proj_data):
+    """
+    New zero STIR projection data in memory, with the same geometry as `proj_data`.
+    """
+    return ProjDataInMemory(proj_data.get_exam_info(), proj_data.get_proj_data_info())
+
+
+class BufferPool(object):
+
+    """
+    Pool of (volume, projection data) STIR buffers of a given geometry.
+
+    Buffers are created on demand, up to `max_size` (unbounded if None);
+    when they are all in use, `checkout` waits for one to be returned.
+    """
+
+    def __init__(self, volume, proj_data, max_size=None):
+        """
+        volume, proj_data: STIR objects, which are the first buffers of the pool
+        """
+        if max_size is not None and max_size < 1:
+            raise ValueError("The pool size should be at least one, not {}".format(max_size))
+        self.max_size = max_size
+        self._template = (volume, proj_data)
+        self._free = [self._template]
+        self._num_buffers = 1
+        self._condition = threading.Condition()
+
+    @property
+    def num_buffers(self):
+        """
+        Number of buffers created so far.
+        """
+        return self._num_buffers
+
+    def _create(self):
+        volume, proj_data = self._template
+        return (empty_volume_like(volume), empty_proj_data_like(proj_data))
+
+    def _acquire(self):
+        with self._condition:
+            while not self._free:
+                if self.max_size is None or self._num_buffers < self.max_size:
+                    self._num_buffers += 1
+                    break
+                self._condition.wait()
+            else:
+                # the most recently used buffers are reused first
+                return self._free.pop()
+        try:
+            return self._create()
+        except BaseException:
+            with self._condition:
+                self._num_buffers -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, buffers):
+        with self._condition:
+            self._free.append(buffers)
+            self._condition.notify()
+
+    @contextmanager
+    def checkout(self):
+        """
+        Context manager returning a pair (volume, proj_data) for exclusive use.
+        """
+        buffers = self._acquire()
+        try:
+            yield buffers
+        finally:
+            self._release(buffers)
@@ -0,0 +1,112 @@
+"""
+Registry of set-up STIR projectors, shared by all the operators of the same geometry.
+
+Setting up a projection matrix is costly, and the matrix caches the elements
+it computes, so the projectors of equal geometries are created once and reused.
+The least recently used ones are dropped when the estimated memory of the
+registered matrices exceeds a budget.
+"""
+
+import threading
+from collections import OrderedDict
+
+from .matrix import geometry_key
+from ..scanner.memory import estimate_matrix_bytes as _estimate_matrix_bytes
+
+
+def estimate_matrix_bytes(proj_data_info, volume, symmetry_swap_segment=True):
+    """
+    Rough estimate of the memory of a ray-tracing projection matrix once all its elements are computed.
+    See `odlpet.scanner.memory.estimate_matrix_bytes`.
+    """
+    min_indices = volume.get_min_indices()
+    max_indices = volume.get_max_indices()
+    volume_shape = [max_indices[i] - min_indices[i] + 1 for i in [1, 2, 3]]
+    num_segments = proj_data_info.get_max_segment_num() - proj_data_info.get_min_segment_num() + 1
+    return _estimate_matrix_bytes(proj_data_info.get_num_views(), proj_data_info.get_num_tangential_poss(),
+                                  num_segments, volume_shape, symmetry_swap_segment)
+
+
+class ProjectorRegistry(object):
+
+    """
+    Set-up STIR projector and back-projector pairs by geometry, with LRU eviction.
+    """
+
+    def __init__(self, max_bytes=2**30):
+        """
+        max_bytes: budget for the estimated memory of the registered matrices
+        (the most recently used pair is always kept)
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """
+        Estimated memory of the registered matrices.
+        """
+        return sum(nbytes for (_, _, nbytes) in self._entries.values())
+
+    def get_key(self, proj_data_info, volume, restrict_to_cylindrical_FOV=True, symmetry_swap_segment=True):
+        return geometry_key(proj_data_info, volume, proj_data_info.parameter_info(),
+                            bool(restrict_to_cylindrical_FOV), bool(symmetry_swap_segment))
+
+    def get_projectors(self, proj_data_info, volume, restrict_to_cylindrical_FOV=True, symmetry_swap_segment=True):
+        """
+        Set-up projector and back-projector sharing one projection matrix using all the symmetries.
+
+        The same objects are returned for equal geometries.
+        """
+        from .bindings import get_stir_projectors
+        key = self.get_key(proj_data_info, volume, restrict_to_cylindrical_FOV, symmetry_swap_segment)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                projector, back_projector, _ = self._entries[key]
+                return projector, back_projector
+            projector, back_projector = get_stir_projectors(
+                proj_data_info, volume,
+                restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV,
+                symmetry_swap_segment=symmetry_swap_segment)
+            nbytes = estimate_matrix_bytes(proj_data_info, volume, symmetry_swap_segment)
+            self._entries[key] = (projector, back_projector, nbytes)
+            self.evict()
+            return projector, back_projector
+
+    def evict(self):
+        """
+        Drop the least recently used pairs until the registry fits in the budget.
+
+        Operators keep the projectors they use alive.
+        """
+        with self._lock:
+            while len(self._entries) > 1 and self.size > self.max_bytes:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_DEFAULT_REGISTRY = None
+
+def get_default_registry():
+    """
+    The registry used by the projectors of `Compression` and `odlpet.stir.io`.
+    """
+    global _DEFAULT_REGISTRY
+    if _DEFAULT_REGISTRY is None:
+        _DEFAULT_REGISTRY = ProjectorRegistry()
+    return _DEFAULT_REGISTRY
+
+def get_projectors(proj_data_info, volume, restrict_to_cylindrical_FOV=True, symmetry_swap_segment=True):
+    """
+    Projector and back-projector of the default registry.
+    """
+    return get_default_registry().get_projectors(proj_data_info, volume,
+                                                 restrict_to_cylindrical_FOV, symmetry_swap_segment)
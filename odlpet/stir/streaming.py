@@ -0,0 +1,139 @@
+"""
+Projection of blocks of segments, one block at a time.
+
+Only the STIR projection data of one block of segments are held in memory.
+The results are written segment by segment into a preallocated output,
+which may be memory mapped (for instance with `numpy.lib.format.open_memmap`),
+so the memory used is bounded by the block size instead of the whole data.
+"""
+
+from stirextra import to_numpy
+from stir import ProjDataInMemory, ExamInfo
+from odl.operator import Operator
+
+import numpy as np
+
+from .bindings import fill_stir_buffer
+from .registry import get_projectors
+from .pool import empty_volume_like
+from ..scanner.sinogram import get_sinogram_info, get_segment_blocks, SinogramIndex
+
+
+def get_block_proj_data_info(proj_data_info, min_segment, max_segment):
+    """
+    Copy of the projection data info restricted to a range of segments.
+    """
+    block_info = proj_data_info.clone()
+    block_info.reduce_segment_range(min_segment, max_segment)
+    return block_info
+
+
+class StreamingForwardProjector(Operator):
+
+    """
+    Forward projector computing the projection data by blocks of segments.
+
+    `project` and `back_project` work with any array in the layout of the range,
+    in particular memory maps; the operator calls write into ODL elements.
+    """
+
+    def __init__(self, domain, range, volume, proj_data_info,
+                 max_sinograms=None, restrict_to_cylindrical_FOV=True):
+        """
+        volume: STIR volume of the domain
+        proj_data_info: STIR projection data info of the whole range
+        max_sinograms: maximum number of sinograms in a block (one segment per block if None)
+        """
+        super().__init__(domain, range, linear=True)
+        self.volume = volume
+        self.proj_data_info = proj_data_info
+        info = get_sinogram_info(proj_data_info)
+        self.index = SinogramIndex(info, proj_data_info.get_num_views(),
+                                   proj_data_info.get_num_tangential_poss())
+        if range.shape != self.index.shape:
+            raise ValueError('range.shape {} does not equal proj shape {}'
+                             ''.format(range.shape, self.index.shape))
+        self.blocks = get_segment_blocks(info, max_sinograms or 0)
+        self._segment_slices = {segment: slice(offset, offset+size) for (segment, offset, size)
+                                in zip(self.index.segments, self.index.offsets, self.index.sizes)}
+        self._block_infos = [get_block_proj_data_info(proj_data_info, *block) for block in self.blocks]
+        self._exam_info = ExamInfo()
+        # the segments of a block have no symmetric segments in the same block
+        self.projector, self.back_projector = get_projectors(
+            proj_data_info, volume,
+            restrict_to_cylindrical_FOV=restrict_to_cylindrical_FOV,
+            symmetry_swap_segment=False)
+        self._adjoint = StreamingBackProjector(self)
+
+    def _iter_blocks(self):
+        """
+        Yield the segments of each block and zero STIR projection data for that block.
+        """
+        for (min_segment, max_segment), block_info in zip(self.blocks, self._block_infos):
+            yield range(min_segment, max_segment+1), ProjDataInMemory(self._exam_info, block_info)
+
+    def project(self, volume, out=None):
+        """
+        Forward project a volume array into `out`, a new array if None.
+        """
+        if out is None:
+            out = np.empty(self.range.shape, dtype=np.float32)
+        stir_volume = empty_volume_like(self.volume)
+        fill_stir_buffer(stir_volume, volume)
+        for segments, proj_data in self._iter_blocks():
+            self.projector.forward_project(proj_data, stir_volume, 0, 1)
+            for segment in segments:
+                out[self._segment_slices[segment]] = to_numpy(proj_data.get_segment_by_sinogram(segment))
+        return out
+
+    def _call(self, volume, out):
+        self.project(volume.asarray(), out=out.asarray())
+
+    @property
+    def adjoint(self):
+        return self._adjoint
+
+
+class StreamingBackProjector(Operator):
+
+    """
+    Back projector accumulating the back projections of blocks of segments.
+    """
+
+    def __init__(self, forward):
+        super().__init__(forward.range, forward.domain, linear=True)
+        self.forward = forward
+
+    def _get_segment(self, data, segment):
+        # objects such as `InterfileProjData` give access to their segments directly
+        if hasattr(data, 'get_segment'):
+            return data.get_segment(segment)
+        return data[self.forward._segment_slices[segment]]
+
+    def back_project(self, data, out=None):
+        """
+        Back project projection data into the volume array `out`, a new array if None.
+
+        data: array in the layout of the range, or an object with a ``get_segment`` method
+        """
+        forward = self.forward
+        if out is None:
+            out = np.empty(self.range.shape, dtype=np.float32)
+        out[...] = 0
+        stir_volume = empty_volume_like(forward.volume)
+        for segments, proj_data in forward._iter_blocks():
+            for segment in segments:
+                stir_segment = proj_data.get_empty_segment_by_sinogram(segment)
+                fill_stir_buffer(stir_segment, self._get_segment(data, segment))
+                proj_data.set_segment(stir_segment)
+            stir_volume.fill(0)
+            forward.back_projector.back_project(stir_volume, proj_data, 0, 1)
+            out += to_numpy(stir_volume)
+        return out
+
+    def _call(self, data, out):
+        self.back_project(data.asarray(), out=out.asarray())
+
+    @property
+    def adjoint(self):
+        return self.forward
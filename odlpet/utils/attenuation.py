@@ -1,22 +1,136 @@
+import threading
+
 import numpy as np
+from odl.operator import Operator
 
 def get_attenuation_multiplicator(operator, attenuation_volume):
     """
     Compute an attenuation multiplicator for a given attenuation volume in cm^{-1}.
+
+    The multiplicator is computed in place, in float32, in an element of the range.
     """
     pixel_size = operator.domain.cell_sides[1]
-    atn_proj = operator(attenuation_volume)
-    return np.exp(-atn_proj*pixel_size/10)
+    atn_proj = operator.range.element()
+    operator(attenuation_volume, out=atn_proj)
+    factors = atn_proj.asarray()
+    factors *= np.float32(-pixel_size/10)
+    np.exp(factors, out=factors)
+    return atn_proj
+
+
+class _SharedBuffer(object):
+
+    """
+    Element of a space, allocated on first use and lent to one caller at a time.
+    """
+
+    def __init__(self, space):
+        self.space = space
+        self._element = None
+        self._lock = threading.Lock()
+
+    def __call__(self, function, *args):
+        """
+        Call ``function(buffer, *args)`` with the shared buffer, or with a temporary
+        if the buffer is in use by another thread.
+        """
+        if self._lock.acquire(blocking=False):
+            try:
+                if self._element is None:
+                    self._element = self.space.element()
+                return function(self._element, *args)
+            finally:
+                self._lock.release()
+        return function(self.space.element(), *args)
+
+
+class AttenuatedProjector(Operator):
+
+    """
+    Projector followed by the multiplication by attenuation factors.
+
+    The factors are computed once and applied in place, in the forward
+    projection and in the back projection.
+    """
+
+    def __init__(self, projector, attenuation_volume=None, factors=None, adjoint=None, buffer=None):
+        """
+        projector: a forward projector, for instance a `ForwardProjectorByBinWrapper`
+        attenuation_volume: attenuation volume in cm^{-1}, used to compute the factors
+        factors: precomputed attenuation factors, for instance to share them between subsets
+        buffer: weighted projection data of the back projection, shared between subsets
+        """
+        if factors is None:
+            if attenuation_volume is None:
+                raise ValueError("An attenuation volume or attenuation factors are needed")
+            factors = get_attenuation_multiplicator(projector, attenuation_volume)
+        super().__init__(projector.domain, projector.range, linear=True)
+        self.projector = projector
+        self.factors = np.ascontiguousarray(factors, dtype=np.float32).reshape(projector.range.shape)
+        if adjoint is None:
+            adjoint = AttenuatedBackProjector(self, buffer=buffer)
+        self._adjoint = adjoint
+
+    def _call(self, volume, out):
+        self.projector(volume, out=out)
+        out.asarray()[...] *= self.factors
+
+    @property
+    def adjoint(self):
+        return self._adjoint
+
+
+class AttenuatedBackProjector(Operator):
+
+    """
+    Multiplication by attenuation factors followed by the back projection.
+    """
 
-def attenuation_conversion(volume, kvp='120'):
+    def __init__(self, forward, buffer=None):
+        super().__init__(forward.range, forward.domain, linear=True)
+        self.forward = forward
+        # weighted projection data, allocated on the first call and reused
+        if buffer is None:
+            buffer = _SharedBuffer(forward.range)
+        self._buffer = buffer
+
+    def _call(self, projections, out):
+        self._buffer(self._back_project, projections, out)
+
+    def _back_project(self, weighted, projections, out):
+        np.multiply(projections.asarray(), self.forward.factors, out=weighted.asarray())
+        self.forward.projector.adjoint(weighted, out=out)
+
+    @property
+    def adjoint(self):
+        return self.forward
+
+
+def attenuated_projectors(projectors, factors):
+    """
+    Attenuated versions of subset projectors, all sharing the same attenuation factors,
+    and the same buffer for their back projections.
+
+    factors: attenuation factors, computed with a projector on all the views
+    (see `get_attenuation_multiplicator`)
+    """
+    factors = np.ascontiguousarray(factors, dtype=np.float32)
+    buffer = _SharedBuffer(projectors[0].range)
+    return [AttenuatedProjector(projector, factors=factors, buffer=buffer) for projector in projectors]
+
+def attenuation_conversion(volume, kvp='120', out=None, slab_size=16):
     """
     Implements the mapping defined in
         Carney, J. P., Townsend, D. W., Rappoport, V. and Bendriem, B. (2006),
         Method for transforming CT images for attenuation correction in PET/CT imaging.
         Med. Phys., 33: 976-983.
         doi:10.1118/1.2174132
+
+    The result is a float32 array, computed `slab_size` slices at a time.
+    out: preallocated float32 array, optional
     """
-    return _piecewise_affine_attenuation_conversion(volume, **KVP_DICT[str(kvp)])
+    return _piecewise_affine_attenuation_conversion(volume, out=out, slab_size=slab_size,
+                                                    **KVP_DICT[str(kvp)])
 
 KVP_DICT = {
     "80":
@@ -57,13 +171,78 @@ KVP_DICT = {
     },
 }
 
-def _piecewise_affine_attenuation_conversion(volume, breakpoint, a, b):
-    attenuation = np.zeros_like(volume, dtype=np.float)
-    #volume_ = volume - 24
-    volume_ = volume
-    small = volume_ < breakpoint
-    attenuation[small] = (volume_[small])*(9.6e-5)
-    attenuation[~small] = a*(volume_[~small]) + b
-    attenuation[attenuation < 0] = 0
-    return attenuation
+def _piecewise_affine_attenuation_conversion(volume, breakpoint, a, b, out=None, slab_size=16):
+    if out is None:
+        out = np.empty(np.shape(volume), dtype=np.float32)
+    for start in range(0, len(volume), slab_size):
+        _convert_slab(volume[start:start+slab_size], out[start:start+slab_size], breakpoint, a, b)
+    return out
 
+def _convert_slab(slab, out, breakpoint, a, b):
+    """
+    Convert a slab of CT numbers in place into `out`.
+    """
+    slab = np.asarray(slab, dtype=np.float32)
+    np.multiply(slab, np.float32(a), out=out)
+    out += np.float32(b)
+    np.multiply(slab, np.float32(9.6e-5), out=out, where=slab < breakpoint)
+    np.maximum(out, 0, out=out)
+
+def _grid_indices(source, space, axis, indices=None):
+    """
+    Fractional indices in `source` of the cell centres of `space` along an axis.
+    """
+    if indices is None:
+        indices = np.arange(space.shape[axis])
+    points = space.min_pt[axis] + (indices + .5) * space.cell_sides[axis]
+    return ((points - source.min_pt[axis]) / source.cell_sides[axis] - .5).astype(np.float32)
+
+def resample_attenuation(attenuation, source, space, out=None, slab_size=16, order=1, transform=None):
+    """
+    Resample an attenuation map to another grid, for instance the PET domain
+    given by `Compression.get_stir_domain`, `slab_size` slices of `space` at a time.
+
+    attenuation: array of the attenuation map, may be a memory map
+    source: ODL space of the attenuation map
+    space: ODL space of the result, with the same axes and units as `source`
+    order: order of the spline interpolation
+    transform: function applied to the source slices before the interpolation
+    Points outside the source grid have zero attenuation.
+    """
+    from scipy import ndimage
+    if out is None:
+        out = space.element()
+    out_arr = out.asarray()
+    y = _grid_indices(source, space, 1)
+    x = _grid_indices(source, space, 2)
+    for start in range(0, space.shape[0], slab_size):
+        stop = min(start + slab_size, space.shape[0])
+        z = _grid_indices(source, space, 0, np.arange(start, stop))
+        # only the source slices around the slab are read
+        first = int(np.clip(np.floor(z.min()) - order, 0, source.shape[0]))
+        last = int(np.clip(np.ceil(z.max()) + order + 1, 0, source.shape[0]))
+        if first >= last:
+            out_arr[start:stop] = 0
+            continue
+        block = attenuation[first:last]
+        if transform is not None:
+            block = transform(block)
+        block = np.asarray(block, dtype=np.float32)
+        coordinates = np.meshgrid(z - first, y, x, indexing='ij', sparse=False)
+        ndimage.map_coordinates(block, coordinates, output=out_arr[start:stop],
+                                order=order, mode='constant', cval=0.)
+    return out
+
+def ct_to_attenuation(ct, ct_space, space, kvp='120', out=None, slab_size=16, order=1):
+    """
+    Attenuation map in cm^{-1} on the grid of `space` from a CT volume in Hounsfield units + 1000.
+
+    The CT is converted and resampled slab by slab, so that the memory used
+    is bounded by the size of a slab, not of the CT volume.
+    ct: CT array, may be a memory map
+    ct_space: ODL space of the CT, with the same axes and units as `space`
+    """
+    def convert(slab):
+        return attenuation_conversion(slab, kvp=kvp, slab_size=slab_size)
+    return resample_attenuation(ct, ct_space, space, out=out,
+                                slab_size=slab_size, order=order, transform=convert)
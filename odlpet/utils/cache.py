@@ -0,0 +1,120 @@
+"""
+A size-bounded on-disk cache of NumPy arrays.
+"""
+
+import hashlib
+import os
+import tempfile
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+
+def get_default_cache_dir():
+    """
+    Cache directory, taken from ``ODLPET_CACHE_DIR`` if set.
+    """
+    default = Path.home() / '.cache' / 'odlpet'
+    return Path(os.environ.get('ODLPET_CACHE_DIR', default.as_posix()))
+
+def hash_key(*parts):
+    """
+    Hexadecimal key from the representation of `parts`.
+
+    The parts should only contain plain Python objects (int, float, str, tuples...),
+    so that the key does not depend on the NumPy version.
+    """
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+class DiskCache(object):
+
+    """
+    Dictionary of arrays stored as ``.npz`` files in a directory.
+
+    When the total size exceeds `max_bytes`, the least recently used
+    entries are removed, except the one just stored.
+    """
+
+    suffix = '.npz'
+
+    def __init__(self, directory=None, max_bytes=2**31):
+        if directory is None:
+            directory = get_default_cache_dir()
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return self.directory / (key + self.suffix)
+
+    def __contains__(self, key):
+        return self._path(key).exists()
+
+    def get(self, key):
+        """
+        Return a dictionary of arrays, or None if `key` is not in the cache.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path.as_posix()) as stored:
+                arrays = {name: stored[name] for name in stored.files}
+        except (IOError, OSError):
+            return None
+        # mark as recently used
+        os.utime(path.as_posix(), None)
+        return arrays
+
+    def put(self, key, **arrays):
+        """
+        Store the arrays under `key`, then evict old entries if needed.
+
+        An entry larger than `max_bytes` is kept, with a warning.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first so that readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.directory.as_posix())
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, self._path(key).as_posix())
+        except BaseException:
+            os.remove(tmp)
+            raise
+        path = self._path(key)
+        size = path.stat().st_size
+        if size > self.max_bytes:
+            warnings.warn("Cache entry {} of {} bytes exceeds the cache size of {} bytes"
+                          "".format(key, size, self.max_bytes))
+        self.evict(keep=path)
+
+    def _entries(self):
+        if not self.directory.exists():
+            return []
+        entries = [(p.stat().st_mtime, p.stat().st_size, p) for p in self.directory.glob('*' + self.suffix)]
+        return sorted(entries)
+
+    def size(self):
+        """
+        Total size of the cache in bytes.
+        """
+        return sum(size for (_, size, _) in self._entries())
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used entries until the cache fits in `max_bytes`,
+        or only `keep` (a path of an entry) is left.
+        """
+        entries = self._entries()
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, path) in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink()
+            total -= size
+
+    def clear(self):
+        for (_, _, path) in self._entries():
+            path.unlink()
@@ -0,0 +1,194 @@
+"""
+Interfile projection data (``.hs`` header and ``.s`` data), read without STIR.
+
+The data file is memory mapped, so opening a study does not read it,
+and only the segments which are accessed are loaded.
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from ..scanner.sinogram import segment_reordered_
+
+
+_NUMBER_FORMATS = {
+    'float': 'f',
+    'signed integer': 'i',
+    'unsigned integer': 'u',
+}
+
+_BYTE_ORDERS = {
+    'littleendian': '<',
+    'bigendian': '>',
+}
+
+def _parse_value(value):
+    value = value.strip()
+    if value.startswith('{') and value.endswith('}'):
+        return [_parse_value(item) for item in value[1:-1].split(',') if item.strip()]
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+def parse_header(header_file):
+    """
+    Dictionary of the keys of an Interfile header.
+
+    The keys are normalised: lower case, without the leading ``!``
+    and with single spaces. List values such as ``{ 11,15,11}`` are
+    converted to lists, and numbers to int or float.
+    """
+    header = {}
+    for line in Path(header_file).read_text(errors='replace').splitlines():
+        line = line.split(';', 1)[0]
+        if ':=' not in line:
+            continue
+        key, value = line.split(':=', 1)
+        key = ' '.join(key.strip().lstrip('!').lower().split())
+        if key:
+            header[key] = _parse_value(value)
+    return header
+
+def _as_list(value):
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+class InterfileProjData(object):
+
+    """
+    Memory mapped Interfile projection data.
+
+    `get_segment` returns the sinograms of one segment, of shape
+    ``(axial, view, tangential)``, as a view of the data file.
+    `to_array` returns all the sinograms in the layout of `get_range_from_proj_data`,
+    that is, segments ordered as 0, +1, -1, +2, -2, ...
+    """
+
+    def __init__(self, header_file, mode='r'):
+        """
+        header_file: path of the ``.hs`` header
+        mode: memory map mode, 'r' (read only), 'r+' or 'c' (copy on write)
+        """
+        self.header_file = Path(header_file)
+        self.header = header = parse_header(self.header_file)
+        if 'name of data file' not in header:
+            raise ValueError("No data file in {}".format(self.header_file))
+        self.data_file = self.header_file.parent / str(header['name of data file'])
+
+        number_format = str(header.get('number format', 'float')).lower()
+        if number_format not in _NUMBER_FORMATS:
+            raise ValueError("Unsupported number format: {}".format(number_format))
+        byte_order = str(header.get('imagedata byte order', 'littleendian')).lower()
+        if byte_order not in _BYTE_ORDERS:
+            raise ValueError("Unsupported byte order: {}".format(byte_order))
+        self.dtype = np.dtype('{}{}{}'.format(_BYTE_ORDERS[byte_order],
+                                              _NUMBER_FORMATS[number_format],
+                                              header.get('number of bytes per pixel', 4)))
+        self.scale = float(header.get('image scaling factor[1]', 1))
+
+        labels = [str(header.get('matrix axis label [{}]'.format(i), '')).lower() for i in (4, 3, 2, 1)]
+        if labels[0] != 'segment' or labels[3] != 'tangential coordinate' \
+           or set(labels[1:3]) != {'view', 'axial coordinate'}:
+            raise ValueError("Unsupported axes: {}".format(labels))
+        # True if the data are stored by view, that is (view, axial, tangential) in each segment
+        self.by_view = labels[1] == 'view'
+        self.num_views = header['matrix size [{}]'.format(3 if self.by_view else 2)]
+        self.num_tangential = header['matrix size [1]']
+        axial_sizes = _as_list(header['matrix size [{}]'.format(2 if self.by_view else 3)])
+
+        min_ring_diffs = _as_list(header.get('minimum ring difference per segment', [0]))
+        max_ring_diffs = _as_list(header.get('maximum ring difference per segment', [0]))
+        if not len(axial_sizes) == len(min_ring_diffs) == len(max_ring_diffs) == header['matrix size [4]']:
+            raise ValueError("Inconsistent number of segments in {}".format(self.header_file))
+        ring_differences = list(zip(min_ring_diffs, max_ring_diffs))
+        # as in STIR, the segments are numbered by increasing ring differences,
+        # the segment zero being the one containing the ring difference zero
+        zero = [i for (i, (lo, hi)) in enumerate(ring_differences) if lo <= 0 <= hi]
+        if len(zero) != 1:
+            raise ValueError("No segment zero in {}".format(self.header_file))
+        ranks = sorted(range(len(ring_differences)), key=lambda i: ring_differences[i])
+        segments = [0] * len(ring_differences)
+        for (rank, i) in enumerate(ranks):
+            segments[i] = rank - ranks.index(zero[0])
+        self.ring_differences = dict(zip(segments, ring_differences))
+        for (segment, (lo, hi)) in self.ring_differences.items():
+            if self.ring_differences.get(-segment) != (-hi, -lo):
+                raise ValueError("The segments of {} are not symmetric around the segment zero: {}"
+                                 "".format(self.header_file, self.ring_differences))
+
+        self.offset = int(header.get('data offset in bytes[1]', 0))
+        self.info = list(zip(segments, axial_sizes))
+        self.shape = (sum(axial_sizes), self.num_views, self.num_tangential)
+        # the memory map is only created when the data are accessed
+        self.mode = mode
+        self._data = None
+
+    @property
+    def segments(self):
+        """
+        Segment numbers, in the order of the sinograms.
+        """
+        return sorted((segment for (segment, _) in self.info), key=segment_reordered_)
+
+    @property
+    def data(self):
+        """
+        Memory map of the whole data file.
+        """
+        if self._data is None:
+            self._data = np.memmap(self.data_file, dtype=self.dtype, mode=self.mode,
+                                   offset=self.offset, shape=(self.shape[0] * self.num_views * self.num_tangential,))
+        return self._data
+
+    def _get_raw_segment(self, segment):
+        start = 0
+        for (segment_, size) in self.info:
+            length = size * self.num_views * self.num_tangential
+            if segment_ == segment:
+                raw = self.data[start:start+length]
+                if self.by_view:
+                    return raw.reshape(self.num_views, size, self.num_tangential).transpose(1, 0, 2)
+                return raw.reshape(size, self.num_views, self.num_tangential)
+            start += length
+        raise ValueError("Segment {} not in {}".format(segment, [s for (s, _) in self.info]))
+
+    def get_segment(self, segment):
+        """
+        Sinograms of the segment, of shape (axial, view, tangential).
+
+        No data are copied unless there is a scaling factor.
+        """
+        raw = self._get_raw_segment(segment)
+        if self.scale != 1:
+            return raw * np.float32(self.scale)
+        return raw
+
+    def to_array(self, out=None):
+        """
+        All the sinograms as a float32 array in the layout of `get_range_from_proj_data`.
+
+        out: array of shape `shape` to fill, for instance an ODL element
+        """
+        if out is None:
+            out = np.empty(self.shape, dtype=np.float32)
+        start = 0
+        for segment in self.segments:
+            raw = self._get_raw_segment(segment)
+            stop = start + len(raw)
+            out[start:stop] = raw
+            if self.scale != 1:
+                out[start:stop] *= self.scale
+            start = stop
+        return out
+
+    def close(self):
+        """
+        Release the memory map.
+        """
+        self._data = None
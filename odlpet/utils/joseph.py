@@ -0,0 +1,197 @@
+"""
+Joseph projector in NumPy, an alternative to the STIR projectors.
+
+Each line of response is sampled once per voxel plane crossed along its main
+direction (x or y), with bilinear interpolation in the other two directions.
+The computation is vectorized over the lines of response of a view, and the
+views are distributed over a thread pool, shared by a projector and its adjoint.
+The back projection uses the same interpolation weights, so it is the exact adjoint.
+
+The voxel centres are at ``min_pt + index*cell_sides`` in x and y, as in
+`space_from_stir_domain`, and the volume is axially centred in the scanner.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import weakref
+
+import numpy as np
+from odl.operator import Operator
+
+
+class JosephProjector(Operator):
+
+    """
+    Forward projector computing line integrals with Joseph's method.
+    """
+
+    def __init__(self, domain, range, geometry, views=None, restrict_to_cylindrical_FOV=True,
+                 num_threads=None, adjoint=None):
+        """
+        domain: ODL space of the volume, with axes (z, y, x)
+        range: ODL space of the projection data, of shape `geometry.shape`
+        geometry: a `BinGeometry`
+        views: views to project (all if None), the others are zero, as in subset projectors
+        num_threads: number of threads over which the views are distributed (default: number of CPUs)
+        """
+        if range.shape != geometry.shape:
+            raise ValueError('range.shape {} does not equal the geometry shape {}'
+                             ''.format(range.shape, geometry.shape))
+        super().__init__(domain, range, linear=True)
+        self.geometry = geometry
+        if views is None:
+            views = np.arange(range.shape[1])
+        self.views = np.asarray(views)
+        if num_threads is None:
+            num_threads = os.cpu_count() or 1
+        self.num_threads = num_threads
+        # the threads are started on the first call, and stopped with `shutdown`
+        # or when the projector is garbage collected
+        executor = ThreadPoolExecutor(num_threads)
+        self._executor = executor
+        self._finalizer = weakref.finalize(self, executor.shutdown)
+
+        num_z, num_y, num_x = domain.shape
+        cell_z, cell_y, cell_x = domain.cell_sides
+        self._z_start = -(num_z - 1) / 2 * cell_z
+        self._y_centres = domain.min_pt[1] + np.arange(num_y) * cell_y
+        self._x_centres = domain.min_pt[2] + np.arange(num_x) * cell_x
+        if restrict_to_cylindrical_FOV:
+            radius = min(num_x * cell_x, num_y * cell_y) / 2
+            self._mask = (self._y_centres[:, None]**2 + self._x_centres[None, :]**2 <= radius**2)
+        else:
+            self._mask = None
+        self._tan_theta = geometry.get_tan_theta()
+        self._half_lengths = geometry.get_half_lengths()
+        # path length of a step along the line, including the axial slope
+        self._slope = np.sqrt(1 + self._tan_theta**2)
+        if adjoint is None:
+            adjoint = JosephBackProjector(self)
+        self._adjoint = adjoint
+
+    def _samples(self, view):
+        """
+        Yield, for each voxel plane crossed by the lines of the view, the plane index,
+        whether the planes are along x, the flat indices in the plane
+        and the weights of the four interpolation corners.
+        """
+        geometry = self.geometry
+        phi = geometry.phi[view]
+        cos, sin = np.cos(phi), np.sin(phi)
+        num_z, num_y, num_x = self.domain.shape
+        cell_z, cell_y, cell_x = self.domain.cell_sides
+        along_x = abs(sin) >= abs(cos)
+        if along_x:
+            centres, others, num_other = self._x_centres, self._y_centres, num_y
+            step = cell_x / abs(sin)
+        else:
+            centres, others, num_other = self._y_centres, self._x_centres, num_x
+            step = cell_y / abs(cos)
+        other_start = others[0]
+        other_cell = cell_y if along_x else cell_x
+        s = geometry.s
+        for plane, centre in enumerate(centres):
+            if along_x:
+                a = (centre - s * cos) / sin
+                other = s * sin - a * cos
+            else:
+                a = (s * sin - centre) / cos
+                other = s * cos + a * sin
+            inside = np.abs(a) <= self._half_lengths
+            # bilinear interpolation in the plane
+            position = (other - other_start) / other_cell
+            other_low = np.floor(position).astype(int)
+            other_weight = position - other_low
+            z = geometry.m[:, None] + a[None, :] * self._tan_theta
+            z_position = (z - self._z_start) / cell_z
+            z_low = np.floor(z_position).astype(int)
+            z_weight = z_position - z_low
+            indices = []
+            weights = []
+            for (dz, wz) in [(0, 1 - z_weight), (1, z_weight)]:
+                for (do, wo) in [(0, 1 - other_weight), (1, other_weight)]:
+                    iz = z_low + dz
+                    io = np.broadcast_to(other_low + do, iz.shape)
+                    valid = (iz >= 0) & (iz < num_z) & (io >= 0) & (io < num_other) & inside[None, :]
+                    indices.append(np.where(valid, iz * num_other + io, 0))
+                    weights.append(np.where(valid, wz * wo[None, :] * step * self._slope, 0))
+            yield plane, along_x, np.array(indices), np.array(weights, dtype=np.float32)
+
+    def _get_volume(self, volume):
+        volume = np.asarray(volume, dtype=np.float32)
+        if self._mask is not None:
+            volume = volume * self._mask[None]
+        return volume
+
+    def _project_view(self, volume, view, out):
+        result = np.zeros(out.shape[::2], dtype=np.float32)
+        for plane, along_x, indices, weights in self._samples(view):
+            values = volume[:, :, plane] if along_x else volume[:, plane, :]
+            values = np.ascontiguousarray(values).ravel()
+            result += np.sum(values[indices] * weights, axis=0)
+        out[:, view, :] = result
+
+    def _call(self, volume, out):
+        volume = self._get_volume(volume.asarray())
+        out_arr = out.asarray()
+        out_arr[...] = 0
+        list(self._executor.map(lambda view: self._project_view(volume, view, out_arr), self.views))
+
+    @property
+    def adjoint(self):
+        return self._adjoint
+
+    def shutdown(self):
+        """
+        Stop the threads of the projector and its adjoint.
+        """
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.shutdown()
+
+
+class JosephBackProjector(Operator):
+
+    """
+    Adjoint of the `JosephProjector`.
+    """
+
+    def __init__(self, forward):
+        super().__init__(forward.range, forward.domain, linear=True)
+        self.forward = forward
+
+    def _back_project_views(self, data, views):
+        forward = self.forward
+        num_z, num_y, num_x = self.range.shape
+        volume = np.zeros(self.range.shape, dtype=np.float32)
+        for view in views:
+            sinograms = data[:, view, :]
+            for plane, along_x, indices, weights in forward._samples(view):
+                num_other = num_y if along_x else num_x
+                contributions = np.bincount(indices.ravel(), (weights * sinograms[None]).ravel(),
+                                            minlength=num_z * num_other).reshape(num_z, num_other)
+                if along_x:
+                    volume[:, :, plane] += contributions
+                else:
+                    volume[:, plane, :] += contributions
+        return volume
+
+    def _call(self, data, out):
+        forward = self.forward
+        data = np.asarray(data.asarray(), dtype=np.float32)
+        # each thread accumulates the views of its chunk in its own volume
+        chunks = [chunk for chunk in np.array_split(forward.views, forward.num_threads) if len(chunk)]
+        out_arr = out.asarray()
+        out_arr[...] = 0
+        for volume in forward._executor.map(lambda views: self._back_project_views(data, views), chunks):
+            out_arr += volume
+        if forward._mask is not None:
+            out_arr *= forward._mask[None]
+
+    @property
+    def adjoint(self):
+        return self.forward
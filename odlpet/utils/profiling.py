@@ -0,0 +1,97 @@
+"""
+Optional instrumentation of the projection hot path.
+
+Within a `Profile` context, the projectors and slicing operators record the
+wall time, bytes copied and number of calls of each phase of their evaluations.
+Outside of it, the only cost is a check of a module variable.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+
+PhaseStats = namedtuple('PhaseStats', ['calls', 'seconds', 'bytes'])
+
+
+class ProjectionStats(object):
+
+    """
+    Accumulated calls, wall time and bytes copied per phase.
+    """
+
+    def __init__(self):
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds, nbytes=0):
+        with self._lock:
+            calls, total_seconds, total_bytes = self._phases.get(phase, (0, 0., 0))
+            self._phases[phase] = (calls + 1, total_seconds + seconds, total_bytes + nbytes)
+
+    def __getitem__(self, phase):
+        return PhaseStats(*self._phases[phase])
+
+    def __contains__(self, phase):
+        return phase in self._phases
+
+    def as_dict(self):
+        """
+        Dictionary of the `PhaseStats` of each phase.
+        """
+        with self._lock:
+            return {phase: PhaseStats(*values) for (phase, values) in self._phases.items()}
+
+    def reset(self):
+        with self._lock:
+            self._phases.clear()
+
+    def report(self):
+        """
+        Table of the phases, by decreasing total time.
+        """
+        lines = ['{:<28} {:>8} {:>12} {:>14}'.format('phase', 'calls', 'seconds', 'MB')]
+        phases = sorted(self.as_dict().items(), key=lambda item: -item[1].seconds)
+        for phase, stats in phases:
+            lines.append('{:<28} {:>8} {:>12.6f} {:>14.3f}'.format(
+                phase, stats.calls, stats.seconds, stats.bytes / 2**20))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return self.report()
+
+
+# the stats being recorded, None when profiling is disabled
+ACTIVE = None
+
+class Profile(object):
+
+    """Context manager recording the projection phases into a `ProjectionStats`."""
+
+    def __init__(self, stats=None):
+        if stats is None:
+            stats = ProjectionStats()
+        self.stats = stats
+        self.old_stats = None
+
+    def __enter__(self):
+        global ACTIVE
+        self.old_stats = ACTIVE
+        ACTIVE = self.stats
+        return self.stats
+
+    def __exit__(self, *_):
+        global ACTIVE
+        ACTIVE = self.old_stats
+
+
+def timed(stats, phase, nbytes, function, *args, **kwargs):
+    """
+    Call `function`, recording its time into `stats` unless `stats` is None.
+    """
+    if stats is None:
+        return function(*args, **kwargs)
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    stats.add(phase, time.perf_counter() - start, nbytes)
+    return result
@@ -1,22 +1,124 @@
+import numpy as np
 from odl.operator import Operator
 
+from . import profiling
+from .profiling import timed
+
+
+def _normalize_slicing(slicing, shape):
+    """
+    Slicing as a tuple with one item per axis (and the ``None`` new axes),
+    the ellipsis expanded and boolean masks converted to non-negative integer indices.
+
+    The items may be integers, slices, ``...``, ``None``, and one-dimensional
+    integer arrays or boolean masks; other items raise `IndexError`.
+    """
+    if not isinstance(slicing, tuple):
+        slicing = (slicing,)
+    num_ellipsis = sum(item is Ellipsis for item in slicing)
+    num_axes = sum(item is not None and item is not Ellipsis for item in slicing)
+    if num_ellipsis > 1:
+        raise IndexError("An index can only have a single ellipsis")
+    if num_axes > len(shape):
+        raise IndexError("Too many indices for shape {}".format(shape))
+    # the ellipsis, or the end of the slicing, stands for the missing axes
+    position = [item is Ellipsis for item in slicing].index(True) if num_ellipsis else len(slicing)
+    slicing = slicing[:position] + (slice(None),) * (len(shape) - num_axes) + slicing[position+1:]
+    normalized = []
+    sizes = iter(shape)
+    for item in slicing:
+        if item is None:
+            normalized.append(item)
+            continue
+        size = next(sizes)
+        if isinstance(item, (list, np.ndarray)):
+            item = np.asarray(item)
+            if item.ndim != 1:
+                raise IndexError("Index arrays and boolean masks must be one-dimensional, got shape {}"
+                                 "".format(item.shape))
+            if item.dtype == bool:
+                item = np.flatnonzero(item)
+            item = np.where(item < 0, item + size, item).astype(np.intp)
+        elif not isinstance(item, (slice, int, np.integer)):
+            raise IndexError("Unsupported slicing: {}".format(item))
+        normalized.append(item)
+    return tuple(normalized)
+
+def _sliced_shape(shape, slicing):
+    """
+    Shape of an array of shape `shape` indexed by a normalized slicing
+    with at most one index array.
+    """
+    sliced = []
+    sizes = iter(shape)
+    for item in slicing:
+        if item is None:
+            sliced.append(1)
+            continue
+        size = next(sizes)
+        if isinstance(item, slice):
+            sliced.append(len(range(*item.indices(size))))
+        elif isinstance(item, np.ndarray):
+            if len(item) and not (0 <= item.min() and item.max() < size):
+                raise IndexError("Indices out of bounds for size {}".format(size))
+            sliced.append(len(item))
+    return tuple(sliced)
+
+def _take_axis(slicing):
+    """
+    Axis of the index array if all the other items are full slices, None otherwise.
+    """
+    arrays = [axis for (axis, item) in enumerate(slicing) if isinstance(item, np.ndarray)]
+    full = [axis for (axis, item) in enumerate(slicing) if isinstance(item, slice) and item == slice(None)]
+    if len(arrays) == 1 and len(arrays) + len(full) == len(slicing):
+        return arrays[0]
+    return None
+
+def _sliced_space(domain, slicing):
+    """
+    Tensor space of the sliced elements of `domain`, computed from the shape only.
+    """
+    tspace = getattr(domain, 'tspace', domain)
+    return type(tspace)(_sliced_shape(domain.shape, slicing), dtype=tspace.dtype, weighting=tspace.weighting)
+
+
 class SlicingProjectionOperator(Operator):
     """
     Projection operator defined from a slice.
+
+    The slicing may contain integers, slices, ``...``, ``None``, and at most one
+    index array or boolean mask, which must be one-dimensional.
+    Boolean masks in the slicing are stored as integer indices.
     """
     def __init__(self, domain, codomain=None, slicing=None):
+        slicing = _normalize_slicing(slicing, domain.shape)
+        if sum(isinstance(item, np.ndarray) for item in slicing) > 1:
+            raise IndexError("At most one index array is supported")
         if codomain is None:
-            # very inefficient way to obtain the codomain
-            codomain = domain.zero()[slicing].space
+            codomain = _sliced_space(domain, slicing)
         super(SlicingProjectionOperator, self).__init__(domain, codomain, linear=True)
         self.__slicing = slicing
+        self.__axis = _take_axis(slicing)
 
     @property
     def slicing(self):
         return self.__slicing
 
-    def _call(self, x):
-        return x[self.slicing]
+    def _call(self, x, out):
+        stats = profiling.ACTIVE
+        if stats is None:
+            self._project(x, out)
+        else:
+            timed(stats, 'slicing.projection', out.asarray().nbytes, self._project, x, out)
+
+    def _project(self, x, out):
+        out_arr = out.asarray()
+        if self.__axis is None:
+            out_arr[...] = x.asarray()[self.slicing]
+        else:
+            # copy the selected entries directly into `out`
+            # (the indices are checked already, and 'clip' avoids a buffer)
+            np.take(x.asarray(), self.slicing[self.__axis], axis=self.__axis, out=out_arr, mode='clip')
 
     @property
     def adjoint(self):
@@ -28,18 +130,24 @@ class SlicingInjectionOperator(Operator):
     """
     def __init__(self, domain, codomain, slicing):
         super(SlicingInjectionOperator, self).__init__(domain, codomain, linear=True)
-        self.__slicing = slicing
+        self.__slicing = _normalize_slicing(slicing, codomain.shape)
 
     @property
     def slicing(self):
         return self.__slicing
 
-    def _call(self, x):
-        out = self.range.zero()
-        out[self.slicing] = x
-        return out
+    def _call(self, x, out):
+        stats = profiling.ACTIVE
+        if stats is None:
+            self._inject(x, out)
+        else:
+            timed(stats, 'slicing.injection', x.asarray().nbytes, self._inject, x, out)
+
+    def _inject(self, x, out):
+        out_arr = out.asarray()
+        out_arr.fill(0)
+        out_arr[self.slicing] = x.asarray()
 
     @property
     def adjoint(self):
         return SlicingProjectionOperator(self.range, self.domain, self.slicing)
-
@@ -0,0 +1,162 @@
+"""
+Projection with an explicit sparse system matrix.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+import numpy as np
+from scipy import sparse
+from odl.operator import Operator
+
+
+def sparse_matrix_from_data(arrays, format='csr'):
+    """
+    SciPy sparse matrix from the CSR arrays ``data``, ``indices``, ``indptr`` and ``shape``,
+    as returned by `Compression.get_system_matrix`.
+
+    format: any SciPy sparse format, for instance 'csr' or 'csc'
+    """
+    matrix = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                               shape=tuple(arrays['shape']))
+    return matrix.asformat(format)
+
+def restrict_rows(matrix, row_mask):
+    """
+    CSR matrix of the same shape as `matrix`, keeping only the rows of `row_mask`
+    (the other rows are empty, and only cost their entry in ``indptr``).
+    """
+    matrix = matrix.tocsr()
+    row_mask = np.asarray(row_mask, dtype=bool).ravel()
+    row_sizes = np.diff(matrix.indptr)
+    kept = np.repeat(row_mask, row_sizes)
+    indptr = np.zeros_like(matrix.indptr)
+    np.cumsum(np.where(row_mask, row_sizes, 0), out=indptr[1:])
+    return sparse.csr_matrix((matrix.data[kept], matrix.indices[kept], indptr), shape=matrix.shape)
+
+def _row_blocks(num_rows, num_blocks):
+    bounds = np.linspace(0, num_rows, num_blocks+1).astype(int)
+    return [slice(start, stop) for (start, stop) in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+def _row_block(matrix, rows, transpose=False):
+    """
+    CSR matrix of a block of rows (or CSC matrix of its transpose),
+    sharing the data and indices of `matrix`.
+    """
+    start, stop = matrix.indptr[rows.start], matrix.indptr[rows.stop]
+    shape = (rows.stop - rows.start, matrix.shape[1])
+    if transpose:
+        block = sparse.csc_matrix(shape[::-1], dtype=matrix.dtype)
+    else:
+        block = sparse.csr_matrix(shape, dtype=matrix.dtype)
+    # set the arrays directly: the constructors copy small slices of large arrays
+    block.data = matrix.data[start:stop]
+    block.indices = matrix.indices[start:stop]
+    block.indptr = (matrix.indptr[rows.start:rows.stop+1] - start).astype(matrix.indptr.dtype)
+    return block
+
+
+class SparseMatrixOperator(Operator):
+
+    """
+    Linear operator defined by a sparse matrix acting on the flattened elements.
+
+    The product is split in blocks of rows computed on a thread pool
+    (SciPy releases the GIL during sparse products).
+    The blocks share the memory of the matrix, and the adjoint uses its transpose
+    without copying it.
+    Stacks of elements can be mapped at once with `apply_many`.
+    """
+
+    def __init__(self, domain, range, matrix, num_threads=None, adjoint=None):
+        """
+        matrix: a SciPy sparse matrix of shape (range.size, domain.size)
+        num_threads: number of threads (default: number of CPUs)
+        """
+        if matrix.shape != (range.size, domain.size):
+            raise ValueError("Matrix shape {} does not match the spaces: {}"
+                             "".format(matrix.shape, (range.size, domain.size)))
+        super().__init__(domain, range, linear=True)
+        if num_threads is None:
+            num_threads = os.cpu_count() or 1
+        self.num_threads = num_threads
+        self.matrix = matrix.tocsr()
+        self._row_slices = _row_blocks(self.matrix.shape[0], num_threads)
+        self._adjoint = adjoint
+
+    def _map_blocks(self, function, transpose=False):
+        """
+        Apply `function` to the row slices and their blocks (or the transposes
+        of the blocks), and return the results.
+        """
+        def call(rows):
+            return function(rows, _row_block(self.matrix, rows, transpose))
+        if len(self._row_slices) == 1:
+            return [call(self._row_slices[0])]
+        with ThreadPoolExecutor(len(self._row_slices)) as executor:
+            return list(executor.map(call, self._row_slices))
+
+    def _call(self, x, out):
+        x_flat = x.asarray().ravel()
+        out_flat = out.asarray().reshape(-1)
+        def multiply(rows, block):
+            out_flat[rows] = block.dot(x_flat)
+        self._map_blocks(multiply)
+
+    def apply_many(self, xs):
+        """
+        Apply the operator to a stack of elements, given as an array of shape
+        ``(num,) + domain.shape``, and return an array of shape ``(num,) + range.shape``.
+        """
+        xs = np.asarray(xs, dtype=self.matrix.dtype)
+        num = len(xs)
+        xs_flat = xs.reshape(num, -1).T
+        result = np.empty((self.matrix.shape[0], num), dtype=self.matrix.dtype)
+        def multiply(rows, block):
+            result[rows] = block.dot(xs_flat)
+        self._map_blocks(multiply)
+        return result.T.reshape((num,) + self.range.shape)
+
+    @property
+    def adjoint(self):
+        if self._adjoint is None:
+            self._adjoint = SparseMatrixAdjoint(self)
+        return self._adjoint
+
+
+class SparseMatrixAdjoint(Operator):
+
+    """
+    Adjoint of a `SparseMatrixOperator`, multiplying by the transposes of its blocks
+    (CSC matrices sharing the memory of the CSR matrix) and summing the partial results.
+    """
+
+    def __init__(self, forward):
+        super().__init__(forward.range, forward.domain, linear=True)
+        self.forward = forward
+
+    @property
+    def matrix(self):
+        return self.forward.matrix.T
+
+    def _call(self, y, out):
+        y_flat = y.asarray().ravel()
+        partials = self.forward._map_blocks(lambda rows, block: block.dot(y_flat[rows]), transpose=True)
+        out_flat = out.asarray().reshape(-1)
+        out_flat[:] = partials[0]
+        for partial in partials[1:]:
+            out_flat += partial
+
+    def apply_many(self, ys):
+        """
+        Apply the operator to a stack of elements, see `SparseMatrixOperator.apply_many`.
+        """
+        ys = np.asarray(ys, dtype=self.forward.matrix.dtype)
+        num = len(ys)
+        ys_flat = ys.reshape(num, -1).T
+        partials = self.forward._map_blocks(lambda rows, block: block.dot(ys_flat[rows]), transpose=True)
+        return sum(partials[1:], partials[0]).T.reshape((num,) + self.range.shape)
+
+    @property
+    def adjoint(self):
+        return self.forward
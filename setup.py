@@ -13,6 +13,7 @@ setup(
               'odlpet.scanner',
               'odlpet.stir',
               'odlpet.utils',
+              'odlpet.recon',
     ],
     classifiers = [
     'Development Status :: 4 - Beta',
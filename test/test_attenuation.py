@@ -0,0 +1,52 @@
+import numpy as np
+import odl
+import pytest
+
+from odlpet.utils.attenuation import attenuation_conversion, resample_attenuation, ct_to_attenuation, KVP_DICT
+
+
+def test_conversion():
+    ct = np.random.randint(0, 2000, size=(20, 8, 8)).astype(np.int16)
+    params = KVP_DICT['120']
+    expected = np.where(ct < params['breakpoint'], ct*9.6e-5, params['a']*ct + params['b'])
+    computed = attenuation_conversion(ct, slab_size=3)
+    assert computed.dtype == np.float32
+    assert computed == pytest.approx(expected, rel=1e-6)
+
+def test_resample():
+    """
+    Resampling is the linear interpolation of ODL.
+    """
+    attenuation = np.random.rand(20, 30, 30).astype(np.float32)
+    source = odl.uniform_discr([-10, -15, -15], [10, 15, 15], attenuation.shape, dtype='float32', interp='linear')
+    space = odl.uniform_discr([-8, -12, -12], [8, 12, 12], (8, 12, 12), dtype='float32')
+    computed = resample_attenuation(attenuation, source, space, slab_size=3)
+    expected = source.element(attenuation).interpolation(space.points().T).reshape(space.shape)
+    assert computed.asarray() == pytest.approx(expected, abs=1e-6)
+    same = resample_attenuation(attenuation, source, source, slab_size=7)
+    assert same.asarray() == pytest.approx(attenuation, abs=1e-6)
+
+def test_ct_to_attenuation():
+    ct = np.random.randint(0, 2000, size=(20, 30, 30)).astype(np.int16)
+    ct_space = odl.uniform_discr([-10, -15, -15], [10, 15, 15], ct.shape, dtype='float32')
+    space = odl.uniform_discr([-12, -12, -12], [12, 12, 12], (8, 12, 12), dtype='float32')
+    computed = ct_to_attenuation(ct, ct_space, space, slab_size=3)
+    expected = resample_attenuation(attenuation_conversion(ct), ct_space, space)
+    assert computed.asarray() == pytest.approx(expected.asarray(), abs=1e-6)
+
+def test_attenuated_projectors():
+    """
+    The subsets share one back projection buffer, allocated on the first call.
+    """
+    from odlpet.utils.attenuation import attenuated_projectors
+    space = odl.rn(5, dtype='float32')
+    projectors = [odl.ScalingOperator(space, scale) for scale in [1., 2., 3.]]
+    factors = np.linspace(.1, 1, 5)
+    attenuated = attenuated_projectors(projectors, factors)
+    buffer = attenuated[0].adjoint._buffer
+    assert all(proj.adjoint._buffer is buffer for proj in attenuated)
+    assert buffer._element is None
+    y = odl.phantom.uniform_noise(space)
+    for (proj, scale) in zip(attenuated, [1., 2., 3.]):
+        np.testing.assert_allclose(proj.adjoint(y), scale * factors * y.asarray(), rtol=1e-6)
+        np.testing.assert_allclose(proj(y), scale * factors * y.asarray(), rtol=1e-6)
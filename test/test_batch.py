@@ -0,0 +1,53 @@
+import numpy as np
+import numpy.testing as nt
+
+from odlpet.scanner.scanner import Scanner
+from odlpet.scanner.compression import Compression
+from odlpet.stir.batch import BatchForwardProjector
+
+
+def get_projector():
+    compression = Compression(Scanner())
+    compression.num_non_arccor_bins = 10
+    compression.num_of_views = 8
+    return compression.get_projector(stir_domain=compression.get_stir_domain(zoom=.1))
+
+def test_batch_forward():
+    proj = get_projector()
+    num_frames = 5
+    batch = BatchForwardProjector(proj, num_frames, num_workers=2)
+    frames = np.random.rand(num_frames, *proj.domain.shape)
+    result = batch(batch.domain.element(frames))
+    assert result.asarray().shape == (num_frames,) + proj.range.shape
+    for frame, data in zip(frames, result):
+        nt.assert_allclose(data, proj(frame), rtol=1e-5)
+
+def test_batch_adjoint():
+    proj = get_projector()
+    num_frames = 3
+    batch = BatchForwardProjector(proj, num_frames)
+    data = np.random.rand(num_frames, *proj.range.shape)
+    result = batch.adjoint(batch.range.element(data))
+    for frame, volume in zip(data, result):
+        nt.assert_allclose(volume, proj.adjoint(frame), rtol=1e-5)
+
+def test_batch_threads():
+    """
+    The worker threads do not outlive the calls.
+    """
+    import threading
+    proj = get_projector()
+    batch = BatchForwardProjector(proj, 3, num_workers=3)
+    num_threads = threading.active_count()
+    result = batch(batch.domain.one())
+    batch.adjoint(result)
+    assert threading.active_count() == num_threads
+
+def test_batch_default_workers():
+    """
+    By default, there are no more threads than CPUs, whatever the number of frames.
+    """
+    import os
+    batch = BatchForwardProjector(get_projector(), 40)
+    assert batch.num_workers == min(40, os.cpu_count())
+    assert batch.adjoint.num_workers == batch.num_workers
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import numpy.testing as nt
+import pytest
+
+from odlpet.utils.cache import DiskCache, hash_key
+
+
+def test_roundtrip(tmp_path):
+    cache = DiskCache(tmp_path)
+    key = hash_key('geometry', 1, 2.)
+    assert cache.get(key) is None
+    a = np.arange(10, dtype=np.float32)
+    cache.put(key, a=a, b=a[:3])
+    assert key in cache
+    stored = cache.get(key)
+    nt.assert_array_equal(stored['a'], a)
+    nt.assert_array_equal(stored['b'], a[:3])
+
+def test_key():
+    assert hash_key(1, (2., 'a')) == hash_key(1, (2., 'a'))
+    assert hash_key(1, (2., 'a')) != hash_key(1, (3., 'a'))
+
+def test_eviction(tmp_path):
+    """
+    The least recently used entries are removed when the cache is full.
+    """
+    a = np.zeros(1000, dtype=np.float32)
+    cache = DiskCache(tmp_path, max_bytes=10**10)
+    cache.put('first', a=a)
+    entry_size = cache.size()
+    cache.max_bytes = 2*entry_size + entry_size//2
+    cache.put('second', a=a)
+    # make sure 'first' is older
+    os.utime((tmp_path / 'first.npz').as_posix(), (0, 0))
+    cache.put('third', a=a)
+    assert 'first' not in cache
+    assert 'second' in cache
+    assert 'third' in cache
+    assert cache.size() <= cache.max_bytes
+
+def test_large_entry(tmp_path):
+    """
+    An entry larger than the cache is kept, and the older entries are removed.
+    """
+    cache = DiskCache(tmp_path, max_bytes=10**10)
+    cache.put('small', a=np.zeros(10, dtype=np.float32))
+    cache.max_bytes = 1000
+    with pytest.warns(UserWarning):
+        cache.put('large', a=np.zeros(1000, dtype=np.float32))
+    assert 'large' in cache
+    assert 'small' not in cache
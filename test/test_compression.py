@@ -116,3 +116,272 @@ def test_projectors():
     nt.assert_allclose(full_data, reco_data)
 
 
+def test_shared_projectors():
+    """
+    All the subset projectors share the same STIR objects.
+    """
+    c = Compression(Scanner())
+    c.num_non_arccor_bins = 10
+    projs, _ = c.get_projectors(num_subsets=3)
+    assert [p.subset_num for p in projs] == [0, 1, 2]
+    for proj in projs[1:]:
+        assert proj.projector is projs[0].projector
+        assert proj.adjoint.back_projector is projs[0].adjoint.back_projector
+        assert proj.proj_data is projs[0].proj_data
+
+def test_system_matrix(tmp_path):
+    """
+    The cached system matrix gives the same projection as STIR.
+    """
+    from odlpet.utils.cache import DiskCache
+    c = Compression(Scanner())
+    c.num_non_arccor_bins = 10
+    c.num_of_views = 8
+    domain = c.get_stir_domain(zoom=.1)
+    proj = c.get_projector(stir_domain=domain)
+    cache = DiskCache(tmp_path)
+    arrays = c.get_system_matrix(stir_domain=domain, cache=cache)
+    assert len(list(tmp_path.glob('*.npz'))) == 1
+    x = odl.phantom.uniform_noise(proj.domain)
+    rows = np.repeat(np.arange(arrays['shape'][0]), np.diff(arrays['indptr']))
+    weights = arrays['data'] * x.asarray().ravel()[arrays['indices']]
+    computed = np.bincount(rows, weights=weights, minlength=arrays['shape'][0])
+    nt.assert_allclose(computed.reshape(proj.range.shape), proj(x), rtol=1e-4, atol=1e-4)
+    cached = c.get_system_matrix(stir_domain=domain, cache=cache)
+    nt.assert_array_equal(cached['indices'], arrays['indices'])
+
+def test_parallel_projector():
+    c = Compression(Scanner())
+    c.num_non_arccor_bins = 16
+    c.num_of_views = 8
+    proj = c.get_projector(stir_domain=c.get_stir_domain(zoom=.2))
+    with c.get_parallel_projector(num_subsets=3, num_workers=2, zoom=.2) as par:
+        x = odl.phantom.uniform_noise(proj.domain)
+        nt.assert_allclose(par(x), proj(x), rtol=1e-4, atol=1e-5)
+        y = proj.range.one()
+        nt.assert_allclose(par.adjoint(y), proj.adjoint(y), rtol=1e-4, atol=1e-5)
+
+def test_parallel_projector_finalizer():
+    """
+    The worker processes are stopped when the projector is garbage collected.
+    """
+    import gc
+    c = Compression(Scanner())
+    c.num_non_arccor_bins = 16
+    c.num_of_views = 8
+    par = c.get_parallel_projector(num_subsets=2, num_workers=2, zoom=.2)
+    par(par.domain.one())
+    finalizer = par._finalizer
+    del par
+    gc.collect()
+    assert not finalizer.alive
+
+def test_sparse_projector(tmp_path):
+    from odlpet.utils.cache import DiskCache
+    c = Compression(Scanner())
+    c.num_non_arccor_bins = 10
+    c.num_of_views = 8
+    domain = c.get_stir_domain(zoom=.1)
+    proj = c.get_projector(stir_domain=domain)
+    sproj = c.get_sparse_projector(stir_domain=domain, cache=DiskCache(tmp_path))
+    assert sproj.domain == proj.domain
+    assert sproj.range == proj.range
+    x = odl.phantom.uniform_noise(proj.domain)
+    nt.assert_allclose(sproj(x), proj(x), rtol=1e-4, atol=1e-4)
+    y = proj.range.one()
+    nt.assert_allclose(sproj.adjoint(y), proj.adjoint(y), rtol=1e-4, atol=1e-4)
+
+@pytest.mark.parametrize("max_sinograms", [None, 20])
+def test_streaming_projector(tmp_path, max_sinograms):
+    c = Compression(Scanner())
+    c.num_non_arccor_bins = 10
+    c.num_of_views = 8
+    c.max_diff_ring = 3
+    domain = c.get_stir_domain(zoom=.1)
+    proj = c.get_projector(stir_domain=domain)
+    sproj = c.get_streaming_projector(stir_domain=domain, max_sinograms=max_sinograms)
+    assert sproj.range == proj.range
+    x = odl.phantom.uniform_noise(proj.domain)
+    out = np.lib.format.open_memmap(tmp_path / 'data.npy', mode='w+', dtype=np.float32, shape=proj.range.shape)
+    sproj.project(x.asarray(), out=out)
+    expected = proj(x)
+    nt.assert_allclose(out, expected, rtol=1e-4, atol=1e-5)
+    nt.assert_allclose(sproj.adjoint.back_project(out), proj.adjoint(expected), rtol=1e-4, atol=1e-4)
+
+def test_listmode_projector(tmp_path):
+    """
+    The list-mode projections are those of the bins of the events.
+    """
+    from odlpet.utils.cache import DiskCache
+    c = Compression(Scanner())
+    c.num_non_arccor_bins = 10
+    c.num_of_views = 8
+    domain = c.get_stir_domain(zoom=.1)
+    cache = DiskCache(tmp_path)
+    num_events = 100
+    det1, det2 = np.random.randint(c.scanner.num_dets_per_ring, size=(2, num_events))
+    ring1, ring2 = np.random.randint(c.scanner.num_rings, size=(2, num_events))
+    # only the rows of the events are computed, then the cached matrix is used
+    lproj = c.get_listmode_projector(det1, ring1, det2, ring2, stir_domain=domain, cache=cache)
+    assert lproj.matrix.shape == (num_events, lproj.domain.size)
+    sproj = c.get_sparse_projector(stir_domain=domain, cache=cache)
+    cached = c.get_listmode_projector(det1, ring1, det2, ring2, stir_domain=domain, cache=cache)
+    indices, valid = c.get_lor_mapping().get_indices(det1, ring1, det2, ring2)
+    x = odl.phantom.uniform_noise(sproj.domain)
+    expected = np.where(valid, sproj(x).asarray().ravel()[indices], 0)
+    nt.assert_allclose(lproj(x), expected, rtol=1e-5)
+    nt.assert_allclose(cached(x), expected, rtol=1e-5)
+    weights = lproj.range.one()
+    y = np.zeros(sproj.range.size, dtype=np.float32)
+    np.add.at(y, indices[valid], 1)
+    nt.assert_allclose(lproj.adjoint(weights), sproj.adjoint(y.reshape(sproj.range.shape)), rtol=1e-4, atol=1e-4)
+
+@pytest.mark.parametrize("span, view_mashing", [(1, 1), (1, 2), (3, 1), (3, 2)])
+def test_lor_mapping_stir(span, view_mashing):
+    """
+    Detector pairs are mapped to the bins of STIR.
+    """
+    scanner = Scanner()
+    scanner.num_rings = 4
+    scanner.num_dets_per_ring = 24
+    c = Compression(scanner)
+    c.span_num = span
+    c.max_diff_ring = 3
+    c.num_of_views = 12 // view_mashing
+    c.num_non_arccor_bins = 15
+    proj_data_info = c.get_stir_proj_data_info()
+    min_view = proj_data_info.get_min_view_num()
+    min_tangential = proj_data_info.get_min_tangential_pos_num()
+    det1, ring1, det2, ring2 = (a.ravel() for a in np.meshgrid(
+        np.arange(24), np.arange(4), np.arange(24), np.arange(4), indexing='ij'))
+    segment, axial, view, tangential, valid = c.get_lor_mapping().get_bins(det1, ring1, det2, ring2)
+    stir_bin = stir.Bin()
+    for i in range(len(det1)):
+        found = proj_data_info.get_bin_for_det_pair(
+            stir_bin, int(det1[i]), int(ring1[i]), int(det2[i]), int(ring2[i]))
+        assert valid[i] == (found == stir.Succeeded(stir.Succeeded.yes))
+        if valid[i]:
+            min_axial = proj_data_info.get_min_axial_pos_num(int(segment[i]))
+            assert (stir_bin.segment_num, stir_bin.axial_pos_num,
+                    stir_bin.view_num, stir_bin.tangential_pos_num) == (
+                segment[i], axial[i] + min_axial, view[i] + min_view, tangential[i] + min_tangential)
+
+def test_projector_registry():
+    """
+    Equal geometries share the same set-up STIR projectors, also for a standalone back projector.
+    """
+    from odlpet.stir.bindings import BackProjectorByBinWrapper
+    from odlpet.stir.registry import ProjectorRegistry
+    c = Compression(Scanner())
+    c.num_non_arccor_bins = 10
+    c.num_of_views = 8
+    proj = c.get_projector(stir_domain=c.get_stir_domain(zoom=.1))
+    other = Compression(Scanner())
+    other.num_non_arccor_bins = 10
+    other.num_of_views = 8
+    assert other.get_projector(stir_domain=other.get_stir_domain(zoom=.1)).projector is proj.projector
+    back = BackProjectorByBinWrapper(proj.range, proj.domain, proj.volume, proj.proj_data)
+    assert back.back_projector is proj.adjoint.back_projector
+    y = proj.range.one()
+    nt.assert_allclose(back(y), proj.adjoint(y))
+    registry = ProjectorRegistry(max_bytes=0)
+    registry.get_projectors(proj.proj_data_info, proj.volume)
+    registry.get_projectors(proj.proj_data_info, c.get_stir_domain(zoom=.2))
+    assert len(registry) == 1
+
+def test_numpy_backend_agreement():
+    """
+    The NumPy projector agrees with the STIR projector on a smooth volume, without rescaling.
+
+    Both compute line integrals in mm: the ray tracing of STIR integrates the voxels
+    as constant boxes, the NumPy projector interpolates them linearly.
+    For a Gaussian three voxels wide, the NumPy projections are within 1% (in L2 norm)
+    of the exact line integrals (see `test_joseph_line_integrals`), and within 2.5%
+    of those of the constant boxes, hence the 5% bound.
+    """
+    scanner = Scanner()
+    scanner.num_rings = 8
+    scanner.num_dets_per_ring = 40
+    scanner.det_radius = 20.
+    scanner.voxel_size_xy = 1.
+    scanner.ring_spacing = 2.
+    c = Compression(scanner)
+    c.num_non_arccor_bins = 15
+    c.max_diff_ring = 3
+    proj = c.get_projector()
+    nproj = c.get_projector(backend='numpy')
+    assert nproj.domain == proj.domain
+    assert nproj.range == proj.range
+    sigma = 3.
+    num_z, num_y, num_x = proj.domain.shape
+    cell_z, cell_y, cell_x = proj.domain.cell_sides
+    z = (np.arange(num_z) - (num_z - 1) / 2) * cell_z
+    y = proj.domain.min_pt[1] + np.arange(num_y) * cell_y
+    x = proj.domain.min_pt[2] + np.arange(num_x) * cell_x
+    z, y, x = np.meshgrid(z, y, x, indexing='ij')
+    volume = proj.domain.element(np.exp(-(x**2 + y**2 + z**2) / (2 * sigma**2)))
+    expected = proj(volume).asarray()
+    result = nproj(volume).asarray()
+    assert np.linalg.norm(result - expected) <= .05 * np.linalg.norm(expected)
+
+def test_compression_config():
+    """
+    Equal configurations share their STIR projection data info and spaces.
+    """
+    from odlpet.scanner.compression import CompressionConfig
+    c = Compression(mCT())
+    c.span_num = 3
+    config = c.get_config()
+    assert CompressionConfig.from_compression(config.to_compression()) == config
+    other = Compression(mCT())
+    other.span_num = 3
+    assert other._get_shared_stir_proj_data_info() is c._get_shared_stir_proj_data_info()
+    # the public projection data info are new objects, which the projectors do not use
+    modified = c.get_stir_proj_data_info()
+    assert modified is not c._get_shared_stir_proj_data_info()
+    modified.set_num_views(1)
+    assert c.get_projector().range.shape == config.get_range().shape
+    assert other.get_space() is c.get_space()
+    assert c.get_space(zoom=2.) is c.get_space(zoom=2)
+    assert c.get_space(sizes=[3, 4, 5]).shape == (3, 4, 5)
+    assert config.get_range() is other.get_config().get_range()
+    other.span_num = 1
+    assert other.get_config() != config
+    assert config.get_range().shape == c.get_projector().range.shape
+
+def test_sparse_backend(tmp_path):
+    """
+    Subset projectors served from the cached system matrix agree with the STIR subset projectors.
+    """
+    from odlpet.utils.cache import DiskCache
+    c = Compression(Scanner())
+    c.num_non_arccor_bins = 10
+    c.num_of_views = 8
+    domain = c.get_stir_domain(zoom=.1)
+    cache = DiskCache(tmp_path)
+    projs, _ = c.get_projectors(num_subsets=2, stir_domain=domain)
+    sprojs, _ = c.get_projectors(num_subsets=2, stir_domain=domain, backend='sparse', cache=cache)
+    assert cache.size() > 0
+    x = odl.phantom.uniform_noise(projs[0].domain)
+    for proj, sproj in zip(projs, sprojs):
+        assert sproj.range == proj.range
+        nt.assert_allclose(sproj(x), proj(x), rtol=1e-4, atol=1e-4)
+
+def test_sparse_backend_cached(tmp_path, monkeypatch):
+    """
+    Once the system matrix is cached, no STIR matrix is set up.
+    """
+    import odlpet.stir.matrix
+    from odlpet.utils.cache import DiskCache
+    c = Compression(Scanner())
+    c.num_non_arccor_bins = 10
+    c.num_of_views = 8
+    domain = c.get_stir_domain(zoom=.1)
+    cache = DiskCache(tmp_path)
+    expected = c.get_projector(stir_domain=domain, backend='sparse', cache=cache)
+    def fail(*args, **kwargs):
+        raise AssertionError("The STIR matrix should not be set up")
+    monkeypatch.setattr(odlpet.stir.matrix, 'get_proj_matrix', fail)
+    proj = c.get_projector(stir_domain=domain, backend='sparse', cache=cache)
+    x = odl.phantom.uniform_noise(proj.domain)
+    nt.assert_allclose(proj(x), expected(x))
@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+from pathlib import Path
+
+from odlpet.utils.interfile import InterfileProjData, parse_header
+
+base = Path(__file__).parent.parent / 'examples' / 'data' / 'stir'
+
+
+def test_parse_header():
+    header = parse_header(base / 'small.hs')
+    assert header['matrix size [2]'] == [11, 15, 11]
+    assert header['minimum ring difference per segment'] == [-4, -1, 2]
+    assert header['number format'] == 'float'
+    assert 'name of data file' not in header
+
+def test_read_example():
+    """
+    The memory map has the layout of the data file.
+    """
+    proj_data = InterfileProjData(base / 'my_prompts_g1.hs')
+    assert proj_data.shape == (15, 64, 192)
+    raw = np.fromfile(base / 'my_prompts_g1.s', dtype='<f4').reshape(64, 15, 192)
+    segment = proj_data.get_segment(0)
+    assert np.shares_memory(segment, proj_data.data)
+    assert np.array_equal(segment, raw.transpose(1, 0, 2))
+    assert np.array_equal(proj_data.to_array(), raw.transpose(1, 0, 2))
+
+@pytest.mark.parametrize("by_view", [True, False])
+def test_segment_order(tmp_path, by_view):
+    """
+    Segments stored in increasing order are returned as 0, +1, -1.
+    """
+    header = (base / 'small.hs').read_text()
+    header = header.replace(';name of data file := small.s', 'name of data file := small.s')
+    header = header.replace('data offset in bytes[1] := 0', 'data offset in bytes[1] := 16')
+    header = header.replace('imagedata byte order := LITTLEENDIAN', 'imagedata byte order := BIGENDIAN')
+    if not by_view:
+        header = header.replace('matrix axis label [3] := view', 'matrix axis label [3] := axial coordinate')
+        header = header.replace('matrix axis label [2] := axial coordinate', 'matrix axis label [2] := view')
+        header = header.replace('!matrix size [3] := 28', '!matrix size [3] := { 11,15,11}')
+        header = header.replace('!matrix size [2] := { 11,15,11}', '!matrix size [2] := 28')
+    (tmp_path / 'small.hs').write_text(header)
+    segments = {-1: np.random.rand(11, 28, 56), 0: np.random.rand(15, 28, 56), 1: np.random.rand(11, 28, 56)}
+    with open(tmp_path / 'small.s', 'wb') as f:
+        f.write(bytes(16))
+        for segment in [-1, 0, 1]:
+            stored = segments[segment].transpose(1, 0, 2) if by_view else segments[segment]
+            f.write(stored.astype('>f4').tobytes())
+    proj_data = InterfileProjData(tmp_path / 'small.hs')
+    assert proj_data.segments == [0, 1, -1]
+    assert proj_data.ring_differences[1] == (2, 4)
+    for segment, expected in segments.items():
+        assert proj_data.get_segment(segment) == pytest.approx(expected)
+    expected = np.concatenate([segments[0], segments[1], segments[-1]])
+    assert proj_data.to_array() == pytest.approx(expected)
+    with pytest.raises(ValueError):
+        proj_data.get_segment(2)
+
+def test_sinogram_segment_order(tmp_path):
+    """
+    Segments stored as 0, +1, -1 are numbered from their ring differences, not their position.
+    """
+    header = (base / 'small.hs').read_text()
+    header = header.replace(';name of data file := small.s', 'name of data file := small.s')
+    header = header.replace('!matrix size [2] := { 11,15,11}', '!matrix size [2] := { 15,11,11}')
+    header = header.replace('minimum ring difference per segment := { -4,-1,2}',
+                            'minimum ring difference per segment := { -1,2,-4}')
+    header = header.replace('maximum ring difference per segment := { -2,1,4}',
+                            'maximum ring difference per segment := { 1,4,-2}')
+    (tmp_path / 'small.hs').write_text(header)
+    segments = {0: np.random.rand(15, 28, 56), 1: np.random.rand(11, 28, 56), -1: np.random.rand(11, 28, 56)}
+    with open(tmp_path / 'small.s', 'wb') as f:
+        for segment in [0, 1, -1]:
+            f.write(segments[segment].transpose(1, 0, 2).astype('<f4').tobytes())
+    proj_data = InterfileProjData(tmp_path / 'small.hs')
+    assert proj_data.ring_differences == {0: (-1, 1), 1: (2, 4), -1: (-4, -2)}
+    for segment, expected in segments.items():
+        assert proj_data.get_segment(segment) == pytest.approx(expected)
+    assert proj_data.to_array() == pytest.approx(np.concatenate([segments[0], segments[1], segments[-1]]))
+    # segments which are not symmetric around the segment zero
+    (tmp_path / 'small.hs').write_text(header.replace('{ 1,4,-2}', '{ 1,5,-2}'))
+    with pytest.raises(ValueError):
+        InterfileProjData(tmp_path / 'small.hs')
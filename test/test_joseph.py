@@ -0,0 +1,115 @@
+import pytest
+import numpy as np
+import numpy.testing as nt
+import odl
+
+from odlpet.scanner.compression import Compression
+from odlpet.scanner.geometry import BinGeometry, get_sinogram_info_from_rings
+from odlpet.scanner.scanner import Scanner
+from odlpet.scanner.sinogram import get_range_from_shape
+from odlpet.utils.joseph import JosephProjector
+
+
+@pytest.mark.parametrize("num_rings, span, max_diff_ring, info", [
+    (4, 1, 3, [(-3, 1), (-2, 2), (-1, 3), (0, 4), (1, 3), (2, 2), (3, 1)]),
+    (4, 3, 3, [(-1, 3), (0, 7), (1, 3)]),
+    (8, 3, 4, [(-1, 11), (0, 15), (1, 11)]),
+])
+def test_sinogram_info_from_rings(num_rings, span, max_diff_ring, info):
+    assert get_sinogram_info_from_rings(num_rings, span, max_diff_ring) == info
+
+def _get_projector(num_threads=2, views=None):
+    geometry = BinGeometry(32, 4, 4., 100., 1, 3, 16, 15)
+    domain = odl.uniform_discr([0, -60, -60], [28, 60, 60], (7, 24, 24), dtype='float32')
+    return JosephProjector(domain, get_range_from_shape(geometry.shape), geometry,
+                           views=views, num_threads=num_threads)
+
+def test_joseph_adjoint():
+    proj = _get_projector()
+    x = odl.phantom.uniform_noise(proj.domain)
+    y = odl.phantom.uniform_noise(proj.range)
+    nt.assert_allclose(np.vdot(proj(x), y), np.vdot(x, proj.adjoint(y)), rtol=1e-5)
+
+def test_joseph_chords():
+    """
+    The projections of a uniform disk are its chord lengths, for the direct sinograms.
+    """
+    proj = _get_projector()
+    data = proj(proj.domain.one()).asarray()
+    half_lengths = np.sqrt(np.maximum(60**2 - proj.geometry.s**2, 0))
+    central = proj.geometry.ring_difference == 0
+    # the disk is sampled on a grid, so only the central chords are accurate
+    inner = np.abs(proj.geometry.s) < 45
+    nt.assert_allclose(data[central][..., inner].mean(axis=(0, 1)), 2 * half_lengths[inner], rtol=.05)
+
+def test_joseph_line_integrals():
+    """
+    The projections of a Gaussian are its line integrals in mm, without any normalisation.
+    """
+    scanner = Scanner()
+    scanner.num_rings = 8
+    scanner.num_dets_per_ring = 40
+    scanner.det_radius = 20.
+    scanner.voxel_size_xy = 1.
+    scanner.ring_spacing = 2.
+    c = Compression(scanner)
+    c.num_non_arccor_bins = 15
+    c.max_diff_ring = 3
+    proj = c.get_projector(backend='numpy')
+    geometry = proj.geometry
+    sigma = 3.
+    # voxel centres of the projector, the volume is centred in the scanner
+    num_z, num_y, num_x = proj.domain.shape
+    cell_z, cell_y, cell_x = proj.domain.cell_sides
+    z = (np.arange(num_z) - (num_z - 1) / 2) * cell_z
+    y = proj.domain.min_pt[1] + np.arange(num_y) * cell_y
+    x = proj.domain.min_pt[2] + np.arange(num_x) * cell_x
+    z, y, x = np.meshgrid(z, y, x, indexing='ij')
+    result = proj(np.exp(-(x**2 + y**2 + z**2) / (2 * sigma**2))).asarray()
+    # squared distance of the lines of response to the centre
+    tan_theta = geometry.get_tan_theta()
+    distances = geometry.s**2 + geometry.m[:, None]**2 / (1 + tan_theta**2)
+    expected = np.broadcast_to((sigma * np.sqrt(2 * np.pi) * np.exp(-distances / (2 * sigma**2)))[:, None],
+                               result.shape)
+    # the Gaussian is interpolated between voxels three times smaller than its width
+    assert np.linalg.norm(result - expected) <= .02 * np.linalg.norm(expected)
+
+def test_joseph_threads():
+    """
+    The result does not depend on the number of threads, and subsets project their views only.
+    """
+    proj = _get_projector(num_threads=1)
+    x = odl.phantom.uniform_noise(proj.domain)
+    nt.assert_allclose(_get_projector(num_threads=4)(x), proj(x), rtol=1e-6)
+    views = [1, 5, 9]
+    subset = _get_projector(views=views)
+    data = subset(x).asarray()
+    nt.assert_allclose(data[:, views], proj(x).asarray()[:, views], rtol=1e-6)
+    assert not np.delete(data, views, axis=1).any()
+
+def test_joseph_executor():
+    """
+    The threads are shared by the projector and its adjoint, and reused over the calls.
+    """
+    import threading
+    with _get_projector(num_threads=2) as proj:
+        proj.adjoint(proj(proj.domain.one()))
+        num_threads = threading.active_count()
+        proj.adjoint(proj(proj.domain.one()))
+        assert threading.active_count() == num_threads
+    assert not proj._finalizer.alive
+
+def test_numpy_backend():
+    scanner = Scanner()
+    scanner.num_rings = 3
+    scanner.num_dets_per_ring = 40
+    scanner.det_radius = 20.
+    scanner.voxel_size_xy = 2.
+    scanner.ring_spacing = 2.
+    c = Compression(scanner)
+    c.num_non_arccor_bins = 15
+    proj = c.get_projector(backend='numpy')
+    assert proj.domain == c.get_space()
+    assert proj.range.shape == (9, 20, 15)
+    with pytest.raises(ValueError):
+        c.get_projector(backend='unknown')
@@ -0,0 +1,112 @@
+import pytest
+import numpy as np
+
+from odlpet.scanner.lor import LORMapping, get_det_pair, get_view_tangential
+
+
+@pytest.mark.parametrize("num_dets", [12, 16])
+def test_view_tangential(num_dets):
+    """
+    Detector pairs in both orders are mapped back to their view and tangential position.
+    """
+    views, tangentials = np.meshgrid(np.arange(num_dets//2), np.arange(-num_dets//2+1, num_dets//2), indexing='ij')
+    det1, det2 = get_det_pair(views, tangentials, num_dets)
+    view, tangential, swapped = get_view_tangential(det1, det2, num_dets)
+    assert np.array_equal(view, views)
+    assert np.array_equal(tangential, tangentials)
+    assert not swapped.any()
+    view, tangential, swapped = get_view_tangential(det2, det1, num_dets)
+    assert np.array_equal(view, views)
+    assert np.array_equal(tangential, tangentials)
+    assert swapped.all()
+
+@pytest.mark.parametrize("span, max_diff_ring, info", [
+    (1, 3, [(-3, 1), (-2, 2), (-1, 3), (0, 4), (1, 3), (2, 2), (3, 1)]),
+    (3, 3, [(-1, 3), (0, 7), (1, 3)]),
+])
+def test_ring_pairs(span, max_diff_ring, info):
+    """
+    Every axial position of every segment has a ring pair.
+    """
+    num_rings = 4
+    mapping = LORMapping(8, num_rings, span, max_diff_ring, 4, 4, info)
+    ring1, ring2 = np.meshgrid(np.arange(num_rings), np.arange(num_rings))
+    segment, axial, valid = mapping.get_segment_axial(ring1.ravel(), ring2.ravel())
+    found = set(zip(segment[valid], axial[valid]))
+    assert found == {(s, a) for (s, n) in info for a in range(n)}
+
+def test_indices():
+    info = [(-1, 5), (0, 7), (1, 5)]
+    mapping = LORMapping(8, 4, 3, 4, 2, 4, info)
+    det1, det2 = np.meshgrid(np.arange(8), np.arange(8))
+    indices, valid = mapping.get_indices(det1.ravel(), 0, det2.ravel(), 3)
+    assert not valid[det1.ravel() == det2.ravel()].any()
+    assert (indices[valid] < mapping.index.size).all()
+    assert (indices[~valid] == 0).all()
+
+def test_table():
+    """
+    The lookup table gives the same indices as the mapping.
+    """
+    from odlpet.scanner.lor import LORTable
+    mapping = LORMapping(8, 4, 3, 3, 2, 4, [(-1, 3), (0, 7), (1, 3)])
+    table = LORTable(mapping)
+    det1, det2 = np.random.randint(8, size=(2, 1000))
+    ring1, ring2 = np.random.randint(4, size=(2, 1000))
+    indices, valid = table.get_indices(det1, ring1, det2, ring2)
+    expected_indices, expected_valid = mapping.get_indices(det1, ring1, det2, ring2)
+    assert np.array_equal(valid, expected_valid)
+    assert np.array_equal(indices, expected_indices)
+
+def test_table_out_of_range():
+    """
+    Detectors outside the scanner are not in the data, even where the tables would wrap.
+    """
+    from odlpet.scanner.lor import LORTable
+    mapping = LORMapping(8, 4, 3, 3, 2, 4, [(-1, 3), (0, 7), (1, 3)])
+    table = LORTable(mapping)
+    det1 = np.array([0, -1, 0, 8, 2, 2])
+    det2 = np.array([4, 4, 8, 3, 6, 6])
+    ring1 = np.array([1, 1, 1, 1, -1, 1])
+    ring2 = np.array([1, 1, 1, 1, 1, 4])
+    indices, valid = table.get_indices(det1, ring1, det2, ring2)
+    assert valid.tolist() == [True, False, False, False, False, False]
+    assert (indices[~valid] == 0).all()
+
+def test_histogram(tmp_path):
+    from odlpet.scanner.lor import LORTable
+    from odlpet.scanner.listmode import histogram
+    mapping = LORMapping(8, 4, 3, 3, 2, 4, [(-1, 3), (0, 7), (1, 3)])
+    table = LORTable(mapping)
+    events = np.random.randint(4, size=(1000, 4)).astype(np.int16)
+    indices, valid = table.get_indices(*events.T)
+    expected = np.zeros(table.size)
+    np.add.at(expected, indices[valid], 1)
+    counts, rejected = histogram(events, table, chunk_size=100)
+    assert np.array_equal(counts, expected)
+    assert rejected == np.count_nonzero(~valid)
+    np.save(tmp_path / 'events.npy', events)
+    counts, _ = histogram(tmp_path / 'events.npy', table, chunk_size=300)
+    assert np.array_equal(counts, expected)
+    events.tofile(tmp_path / 'events.raw')
+    counts, _ = histogram(tmp_path / 'events.raw', table)
+    assert np.array_equal(counts, expected)
+
+def test_histogram_out():
+    """
+    The counts are added in place to ODL elements, and non contiguous arrays are rejected.
+    """
+    import odl
+    from odlpet.scanner.lor import LORTable
+    from odlpet.scanner.listmode import histogram
+    mapping = LORMapping(8, 4, 3, 3, 2, 4, [(-1, 3), (0, 7), (1, 3)])
+    table = LORTable(mapping)
+    events = np.random.randint(4, size=(100, 4))
+    expected, _ = histogram(events, table)
+    out = odl.rn(mapping.index.shape, dtype='float32').zero()
+    result, _ = histogram(events, table, out=out)
+    assert result is out
+    assert np.array_equal(out.asarray().ravel(), expected)
+    with pytest.raises(ValueError):
+        shape = mapping.index.shape
+        histogram(events, table, out=np.zeros(shape[:2] + (shape[2] + 1,), dtype=np.float32)[..., :-1])
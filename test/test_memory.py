@@ -0,0 +1,78 @@
+import pytest
+
+from odlpet.scanner.compression import Compression
+from odlpet.scanner.memory import estimate_memory, plan_execution
+from odlpet.scanner.scanner import Scanner
+
+INFO = [(-1, 3), (0, 7), (1, 3)]
+
+
+def test_estimate_memory():
+    estimate = estimate_memory(INFO, 8, 10, (7, 11, 11))
+    assert estimate.data == 13 * 8 * 10 * 4
+    assert estimate.volume == 7 * 11 * 11 * 4
+    assert estimate.stir_data == estimate.data
+    assert estimate.total == sum(estimate.as_dict()[name] for name in
+                                 ['data', 'volume', 'stir_data', 'stir_volume', 'copies', 'matrix'])
+    # streaming holds one block in STIR
+    streaming = estimate_memory(INFO, 8, 10, (7, 11, 11), max_sinograms=0)
+    assert streaming.stir_data == 7 * 8 * 10 * 4
+    # parallel workers each hold their buffers and matrix
+    parallel = estimate_memory(INFO, 8, 10, (7, 11, 11), num_workers=3)
+    assert parallel.total > 3 * (estimate.total - estimate.data - estimate.volume)
+
+def test_plan_execution():
+    volume_shape = (7, 11, 11)
+    single = estimate_memory(INFO, 8, 10, volume_shape).total
+    plan = plan_execution(10 * single, INFO, 8, 10, volume_shape, num_subsets=4, max_workers=8)
+    assert plan.max_sinograms is None
+    assert 1 < plan.num_workers <= 4
+    assert plan.estimate.total <= 10 * single
+    plan = plan_execution(single, INFO, 8, 10, volume_shape, num_subsets=4, max_workers=8)
+    assert plan.num_workers == 1
+    with pytest.raises(MemoryError):
+        plan_execution(single // 10, INFO, 8, 10, volume_shape)
+
+def test_plan_subsets():
+    """
+    The number of subsets is chosen to divide the views between the workers.
+    """
+    from odlpet.scanner.memory import choose_num_subsets
+    assert choose_num_subsets(8, 1) == 1
+    assert choose_num_subsets(8, 2) == 2
+    assert choose_num_subsets(8, 3) is None
+    assert choose_num_subsets(12, 5) is None
+    assert choose_num_subsets(20, 5) == 5
+    volume_shape = (7, 11, 11)
+    budget = estimate_memory(INFO, 8, 10, volume_shape, num_workers=3).total
+    # three workers fit, but the 8 views cannot be shared between them
+    plan = plan_execution(budget, INFO, 8, 10, volume_shape, max_workers=3)
+    assert (plan.num_subsets, plan.num_workers) == (2, 2)
+    budget = estimate_memory(INFO, 12, 10, volume_shape, num_workers=3).total
+    plan = plan_execution(budget, INFO, 12, 10, volume_shape, max_workers=3)
+    assert (plan.num_subsets, plan.num_workers) == (3, 3)
+
+def test_streaming_plan():
+    """
+    Streaming is chosen when the projection data dominate the memory.
+    """
+    info = [(-1, 100), (0, 100), (1, 100)]
+    volume_shape = (1, 1, 1)
+    data = estimate_memory(info, 100, 100, volume_shape)
+    streaming = estimate_memory(info, 100, 100, volume_shape, max_sinograms=0)
+    assert streaming.total < data.total
+    plan = plan_execution(streaming.total, info, 100, 100, volume_shape)
+    assert plan.max_sinograms is not None
+
+def test_compression_estimate():
+    scanner = Scanner()
+    scanner.num_rings = 4
+    scanner.num_dets_per_ring = 40
+    c = Compression(scanner)
+    c.num_non_arccor_bins = 15
+    estimate = c.estimate_memory()
+    num_sinograms = 16
+    assert estimate.data == num_sinograms * 20 * 15 * 4
+    assert estimate.volume == c.get_space().size * 4
+    plan = c.plan_execution(estimate.total, max_workers=1)
+    assert plan.estimate == estimate
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from odlpet.scanner.scanner import Scanner
+from odlpet.scanner.compression import Compression
+from odlpet.recon.osem import osem, mlem, get_sensitivities
+
+
+def get_compression():
+    compression = Compression(Scanner())
+    compression.num_non_arccor_bins = 16
+    compression.num_of_views = 8
+    return compression
+
+def kullback_leibler(data, estimate):
+    data = np.asarray(data)
+    estimate = np.asarray(estimate)
+    positive = data > 0
+    return np.sum(estimate - data) + np.sum(data[positive]*np.log(data[positive]/estimate[positive]))
+
+def test_mlem():
+    """
+    MLEM decreases the data discrepancy and keeps the image positive.
+    """
+    compression = get_compression()
+    proj = compression.get_projector(stir_domain=compression.get_stir_domain(zoom=.2))
+    phantom = proj.domain.element(np.random.rand(*proj.domain.shape))
+    data = proj(phantom)
+    background = proj.range.one()
+    measured = data + background
+    x = proj.domain.one()
+    iterates = []
+    times = mlem(proj, x, measured, niter=3, background=background,
+                 callback=lambda x: iterates.append(x.copy()))
+    assert len(times) == len(iterates) == 3
+    assert np.all(x.asarray() >= 0)
+    discrepancies = [kullback_leibler(measured, proj(it) + background) for it in iterates]
+    assert discrepancies[-1] < discrepancies[0]
+
+def test_osem_attenuation():
+    compression = get_compression()
+    stir_domain = compression.get_stir_domain(zoom=.2)
+    projs, _ = compression.get_projectors(num_subsets=2, stir_domain=stir_domain)
+    proj = compression.get_projector(stir_domain=stir_domain)
+    attenuation = np.full(proj.range.shape, .5, dtype=np.float32)
+    phantom = proj.domain.element(np.random.rand(*proj.domain.shape))
+    data = attenuation * proj(phantom).asarray()
+    sensitivities = get_sensitivities(projs, attenuation)
+    assert len(sensitivities) == 2
+    x = proj.domain.one()
+    start = kullback_leibler(data, attenuation * proj(x).asarray())
+    osem(projs, x, data, niter=2, attenuation=attenuation, sensitivities=sensitivities)
+    assert kullback_leibler(data, attenuation * proj(x).asarray()) < start
+    with pytest.raises(ValueError):
+        osem(projs, x, data, sensitivities=sensitivities[:1])
+
+def test_attenuated_projector():
+    """
+    Attenuated projectors give the same reconstruction as attenuation factors passed to OSEM.
+    """
+    from odlpet.utils.attenuation import get_attenuation_multiplicator, attenuated_projectors
+    compression = get_compression()
+    stir_domain = compression.get_stir_domain(zoom=.2)
+    projs, _ = compression.get_projectors(num_subsets=2, stir_domain=stir_domain)
+    proj = compression.get_projector(stir_domain=stir_domain)
+    mu = proj.domain.element(np.full(proj.domain.shape, .1))
+    factors = get_attenuation_multiplicator(proj, mu)
+    assert factors.dtype == np.float32
+    attenuated = attenuated_projectors(projs, factors)
+    phantom = proj.domain.element(np.random.rand(*proj.domain.shape))
+    data = factors * proj(phantom)
+    assert attenuated[0](phantom).asarray() == pytest.approx(factors.asarray() * projs[0](phantom).asarray(), rel=1e-5)
+    x = proj.domain.one()
+    osem(attenuated, x, data, niter=2)
+    expected = proj.domain.one()
+    osem(projs, expected, data, niter=2, attenuation=factors)
+    assert x.asarray() == pytest.approx(expected.asarray(), rel=1e-4, abs=1e-5)
+
+def test_sensitivity_cache(tmp_path):
+    from odlpet.recon.sensitivity import SensitivityCache
+    from odlpet.utils.cache import DiskCache
+    compression = get_compression()
+    stir_domain = compression.get_stir_domain(zoom=.2)
+    projs, _ = compression.get_projectors(num_subsets=2, stir_domain=stir_domain)
+    cache = SensitivityCache(DiskCache(tmp_path))
+    computed = cache.get_sensitivities(compression, 2, stir_domain=stir_domain)
+    expected = get_sensitivities(projs)
+    for c, e in zip(computed, expected):
+        assert pytest.approx(e.asarray()) == c.asarray()
+    # from memory
+    again = cache.get_sensitivities(compression, 2, stir_domain=stir_domain)
+    assert pytest.approx(computed[1].asarray()) == again[1].asarray()
+    # from disk
+    cache.clear()
+    again = cache.get_sensitivities(compression, 2, stir_domain=stir_domain)
+    assert pytest.approx(computed[1].asarray()) == again[1].asarray()
+    # the attenuation changes the key
+    attenuation = np.full(projs[0].range.shape, .5, dtype=np.float32)
+    attenuated = cache.get_sensitivities(compression, 2, stir_domain=stir_domain, attenuation=attenuation)
+    assert pytest.approx(.5*computed[0].asarray()) == attenuated[0].asarray()
+    assert len(list(tmp_path.glob('*.npz'))) == 2
+    # so does the backend
+    stir_key = cache.get_key(compression, 2, stir_domain, compression.get_stir_proj_data_info())
+    sparse_key = cache.get_key(compression, 2, stir_domain, compression.get_stir_proj_data_info(),
+                               backend='sparse')
+    assert sparse_key != stir_key
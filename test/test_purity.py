@@ -29,3 +29,34 @@ def test_purity():
     # print(ms)
     assert pytest.approx(ms[0]) == ms[1]
 
+
+def test_concurrent_calls():
+    """
+    Concurrent evaluations do not interfere with each other.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    compression = Compression(Scanner())
+    compression.num_non_arccor_bins = 10
+    compression.num_of_views = 8
+    proj = compression.get_projector(stir_domain=compression.get_stir_domain(zoom=.5), max_buffers=3)
+    volumes = [np.random.rand(*proj.domain.shape) for i in range(8)]
+    expected = [proj(volume) for volume in volumes]
+    with ThreadPoolExecutor(4) as executor:
+        computed = list(executor.map(proj, volumes))
+    for e, c in zip(expected, computed):
+        assert pytest.approx(e.asarray()) == c.asarray()
+    assert proj.pool.num_buffers <= 3
+
+def test_pool_size():
+    from odlpet.stir.pool import BufferPool
+    compression = Compression(Scanner())
+    domain = compression.get_stir_domain(zoom=.1)
+    pool = BufferPool(domain, compression.get_stir_proj_data(), max_size=2)
+    with pool.checkout() as first:
+        # the first buffers are the ones given to the pool
+        assert first[0] is domain
+        with pool.checkout() as second:
+            assert second[0] is not domain
+    assert pool.num_buffers == 2
+    with pytest.raises(ValueError):
+        BufferPool(domain, compression.get_stir_proj_data(), max_size=0)
@@ -14,3 +14,105 @@ def test_simple_run():
     compression = Compression(Scanner())
     proj = compression.get_projector(stir_domain=compression.get_stir_domain(zoom=.1))
     result = proj(proj.domain.one())
+
+def _peak_allocation(function):
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def test_call_allocations():
+    """
+    Projecting into a preallocated element does not allocate full-size arrays.
+    """
+    from odlpet.scanner.scanner import mCT
+    compression = Compression(mCT())
+    proj = compression.get_projector(stir_domain=compression.get_stir_domain(zoom=.5))
+    x = proj.domain.one()
+    y = proj.range.element()
+    proj(x, out=y) # warm-up
+    data_size = y.asarray().nbytes
+    # only one segment at a time is allocated
+    assert _peak_allocation(lambda: proj(x, out=y)) < data_size // 2
+    vol = proj.domain.element()
+    vol_size = vol.asarray().nbytes
+    # at most one full-size volume
+    assert _peak_allocation(lambda: proj.adjoint(y, out=vol)) < 2 * vol_size
+
+def test_profile():
+    """
+    The phases of the projections are recorded within a profile context only.
+    """
+    from odlpet.utils.profiling import Profile
+    compression = Compression(Scanner())
+    proj = compression.get_projector(stir_domain=compression.get_stir_domain(zoom=.1))
+    x = proj.domain.one()
+    with Profile() as stats:
+        y = proj(x)
+        proj.adjoint(y)
+    for phase in ['forward.fill', 'forward.stir', 'forward.copy', 'back.fill', 'back.stir', 'back.copy']:
+        assert stats[phase].calls == 1
+    assert stats['forward.fill'].bytes == x.asarray().nbytes
+    assert stats['forward.copy'].bytes == y.asarray().nbytes
+    proj(x)
+    assert stats['forward.stir'].calls == 1
+
+def test_fill_stir_buffer():
+    """
+    Volumes, projection data and segments are filled from arrays, whatever type is filled first.
+    """
+    import numpy as np
+    from stirextra import to_numpy
+    from odlpet.stir import bindings
+    compression = Compression(Scanner())
+    compression.max_diff_ring = 1
+    volume = compression.get_stir_domain(zoom=.1)
+    proj_data = compression.get_stir_proj_data()
+    segment = proj_data.get_empty_segment_by_sinogram(1)
+    bindings._FILL_FROM_ARRAY.clear()
+    for stir_buffer in [segment, proj_data, volume]:
+        expected = np.random.rand(*to_numpy(stir_buffer).shape).astype(np.float32)
+        bindings.fill_stir_buffer(stir_buffer, expected)
+        np.testing.assert_allclose(to_numpy(stir_buffer), expected)
+    assert set(bindings._FILL_FROM_ARRAY) == {type(segment), type(proj_data), type(volume)}
+
+def test_fill_stir_buffer_flat():
+    """
+    Bindings whose `fill` only accepts iterators are given the flat iterator of the array.
+    """
+    import numpy as np
+    from odlpet.stir import bindings
+
+    class IteratorBuffer(object):
+        def fill(self, values):
+            if isinstance(values, np.ndarray):
+                raise TypeError("not an iterator")
+            self.values = list(values)
+
+    stir_buffer = IteratorBuffer()
+    expected = np.arange(6, dtype=np.float32).reshape(2, 3)
+    bindings.fill_stir_buffer(stir_buffer, expected)
+    assert bindings._FILL_FROM_ARRAY[IteratorBuffer] is False
+    assert stir_buffer.values == expected.ravel().tolist()
+
+def test_copy_stir_buffer():
+    """
+    Volumes and projection data are copied into the preallocated arrays.
+    """
+    import numpy as np
+    from stirextra import to_numpy
+    from odlpet.stir import bindings
+    compression = Compression(Scanner())
+    compression.max_diff_ring = 1
+    volume = compression.get_stir_domain(zoom=.1)
+    proj_data = compression.get_stir_proj_data()
+    for stir_buffer in [proj_data, volume]:
+        expected = np.random.rand(*to_numpy(stir_buffer).shape).astype(np.float32)
+        bindings.fill_stir_buffer(stir_buffer, expected)
+        out = np.empty_like(expected)
+        assert bindings.copy_stir_buffer(stir_buffer, out) is out
+        np.testing.assert_allclose(out, expected)
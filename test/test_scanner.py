@@ -34,3 +34,28 @@ def test_conversion():
             print(scan_name)
         else:
             assert stir_scan == stir_scan_
+
+def test_lazy_import():
+    """
+    Importing odlpet does not import STIR, ODL or SciPy.
+    """
+    import subprocess, sys
+    code = "import sys, odlpet; print(' '.join(m for m in ('stir', 'odl', 'scipy') if m in sys.modules))"
+    loaded = subprocess.check_output([sys.executable, '-c', code]).decode().split()
+    assert loaded == []
+
+def test_scanner_names_cached():
+    assert scan.get_scanner_names() is scan.get_scanner_names()
+    assert scan.SCANNER_NAMES == list(scan.get_scanner_names())
+
+def test_scanner_config():
+    """
+    Configurations are hashable, convert back to equal scanners, and share their STIR scanner.
+    """
+    config = scan.mCT().get_config()
+    assert config == scan.ScannerConfig.from_scanner(config.to_scanner())
+    assert hash(config) == hash(scan.mCT().get_config())
+    assert scan._get_stir_scanner_from_config(config) is scan._get_stir_scanner_from_config(scan.mCT().get_config())
+    # the public STIR scanners are new objects
+    assert config.get_stir_scanner() is not config.get_stir_scanner()
+    assert scan.Scanner.from_stir_scanner(config.get_stir_scanner()).get_config() == config
@@ -61,3 +61,59 @@ def test_shape():
     projdata = stir.ProjDataInMemory(stir.ExamInfo(), projdatainfo)
     shape = get_shape_from_proj_data(projdata)
     assert shape == projdata.to_array().shape()
+
+@pytest.mark.parametrize("num_views", [8, 12, 6, 5])
+def test_subset_views_partition(num_views):
+    """
+    The subsets form a partition of the views.
+    """
+    from odlpet.scanner.sinogram import get_subset_views
+    for num_subsets in range(1, 5):
+        views = np.concatenate([get_subset_views(num_views, i, num_subsets) for i in range(num_subsets)])
+        assert sorted(views) == list(range(num_views))
+
+@pytest.mark.parametrize("num_views", [8, 12, 6, 5])
+def test_subset_view_mask(num_views):
+    """
+    The analytical view masks are those found by forward projection.
+    """
+    from odlpet.scanner.sinogram import get_subset_view_mask
+    from odlpet.scanner.scanner import Scanner
+    from odlpet.stir.bindings import get_view_mask
+    compression = Compression(Scanner())
+    compression.num_non_arccor_bins = 10
+    compression.num_of_views = num_views
+    num_subsets = 3
+    projs, sprojs = compression.get_projectors(num_subsets=num_subsets)
+    for i, proj in enumerate(projs):
+        expected = get_view_mask(proj)
+        computed = get_subset_view_mask(num_views, i, num_subsets)
+        assert list(computed) == list(expected)
+
+def test_sinogram_index():
+    """
+    The vectorized index agrees with `get_offset`, and `unravel` inverts `ravel`.
+    """
+    from odlpet.scanner.sinogram import SinogramIndex, get_offset
+    info = [(-2, 3), (-1, 5), (0, 7), (1, 5), (2, 3)]
+    index = SinogramIndex(info, 4, 6)
+    segments = np.array([s for (s, n) in info for a in range(n)])
+    axials = np.array([a for (s, n) in info for a in range(n)])
+    expected = [get_offset(s, a, info) for (s, a) in zip(segments, axials)]
+    assert list(index.get_sinogram(segments, axials)) == expected
+    views = np.random.randint(4, size=len(segments))
+    tangentials = np.random.randint(6, size=len(segments))
+    flat = index.ravel(segments, axials, views, tangentials)
+    for computed, original in zip(index.unravel(flat), (segments, axials, views, tangentials)):
+        assert list(computed) == list(original)
+    with pytest.raises(ValueError):
+        index.get_sinogram([0, 3], [0, 0])
+    with pytest.raises(ValueError):
+        index.get_sinogram([0, 2], [0, 3])
+
+def test_segment_blocks():
+    from odlpet.scanner.sinogram import get_segment_blocks
+    info = [(-2, 3), (-1, 5), (0, 7), (1, 5), (2, 3)]
+    assert get_segment_blocks(info) == [(0, 2), (-2, -1)]
+    assert get_segment_blocks(info, 0) == [(0, 0), (1, 1), (2, 2), (-1, -1), (-2, -2)]
+    assert get_segment_blocks(info, 12) == [(0, 1), (2, 2), (-2, -1)]
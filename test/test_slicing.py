@@ -0,0 +1,68 @@
+import numpy as np
+import odl
+import pytest
+
+from odlpet.utils.slicing import SlicingProjectionOperator
+
+space = odl.uniform_discr([0, 0, -1], [10, np.pi, 1], (10, 8, 6), dtype='float32')
+mask = np.array([1, 0, 0, 1, 1, 0, 0, 1], dtype=bool)
+
+@pytest.mark.parametrize("slicing", [
+    (slice(None), mask, slice(None)),
+    (slice(None), [0, 3, -4, 7]),
+    (slice(2, 5),),
+    (slice(None), 2),
+    (slice(1, 3), mask),
+    (Ellipsis, 2),
+    (slice(1, 3), Ellipsis, [0, 2]),
+    (None, slice(None), mask),
+])
+def test_slicing(slicing):
+    """
+    The range is that of the sliced elements, and the injection is the adjoint.
+    """
+    op = SlicingProjectionOperator(space, slicing=slicing)
+    x = odl.phantom.uniform_noise(space)
+    assert op.range == x[slicing].space
+    out = op.range.element()
+    op(x, out=out)
+    assert np.array_equal(out.asarray(), x.asarray()[slicing])
+    y = odl.phantom.uniform_noise(op.range)
+    injected = space.one()
+    op.adjoint(y, out=injected)
+    assert op(x).inner(y) == pytest.approx(x.inner(injected), rel=1e-4)
+
+def test_out_of_bounds():
+    with pytest.raises(IndexError):
+        SlicingProjectionOperator(space, slicing=(slice(None), [0, 8]))
+
+@pytest.mark.parametrize("slicing", [
+    (slice(None), np.ones((8, 6), dtype=bool)),
+    (slice(None), np.zeros((2, 2), dtype=int)),
+    ([0, 1], [0, 1]),
+    (Ellipsis, 0, Ellipsis),
+    (0, 0, 0, 0),
+    (slice(None), 'a'),
+])
+def test_unsupported_slicing(slicing):
+    """
+    Multi-dimensional masks and index arrays, several index arrays, and invalid items
+    are rejected instead of selecting the wrong elements.
+    """
+    with pytest.raises(IndexError):
+        SlicingProjectionOperator(space, slicing=slicing)
+
+def test_profile():
+    from odlpet.utils.profiling import Profile
+    op = SlicingProjectionOperator(space, slicing=(slice(None), mask))
+    x = space.one()
+    op(x)
+    with Profile() as stats:
+        op(x)
+        op.adjoint(op(x))
+    assert stats['slicing.projection'].calls == 2
+    assert stats['slicing.projection'].bytes == 2 * op.range.size * 4
+    assert stats['slicing.injection'].calls == 1
+    op(x)
+    assert stats['slicing.projection'].calls == 2
+    assert 'slicing.projection' in stats.report()
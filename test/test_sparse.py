@@ -0,0 +1,62 @@
+import numpy as np
+import numpy.testing as nt
+import odl
+from scipy import sparse
+
+from odlpet.utils.sparse import SparseMatrixOperator, sparse_matrix_from_data, restrict_rows
+
+
+def get_operator(num_threads):
+    domain = odl.uniform_discr([0, 0], [1, 1], (3, 4), dtype='float32')
+    range = odl.uniform_discr([0], [1], (5,), dtype='float32')
+    matrix = sparse.random(5, 12, density=.3, format='csr', dtype=np.float32)
+    return matrix, SparseMatrixOperator(domain, range, matrix, num_threads=num_threads)
+
+def test_from_data():
+    matrix = sparse.random(5, 12, density=.3, format='csr', dtype=np.float32)
+    arrays = {'data': matrix.data, 'indices': matrix.indices, 'indptr': matrix.indptr, 'shape': np.array(matrix.shape)}
+    csc = sparse_matrix_from_data(arrays, 'csc')
+    assert sparse.isspmatrix_csc(csc)
+    nt.assert_allclose(csc.toarray(), matrix.toarray())
+
+def test_operator():
+    for num_threads in [1, 3]:
+        matrix, op = get_operator(num_threads)
+        x = op.domain.element(np.random.rand(3, 4))
+        nt.assert_allclose(op(x), matrix.dot(x.asarray().ravel()), rtol=1e-5)
+        y = op.range.element(np.random.rand(5))
+        nt.assert_allclose(op.adjoint(y), matrix.T.dot(y.asarray()).reshape(3, 4), rtol=1e-5)
+        assert op.adjoint.adjoint is op
+
+def test_apply_many():
+    matrix, op = get_operator(2)
+    xs = np.random.rand(4, 3, 4)
+    result = op.apply_many(xs)
+    assert result.shape == (4, 5)
+    for x, r in zip(xs, result):
+        nt.assert_allclose(r, op(x), rtol=1e-5)
+
+def test_restrict_rows():
+    matrix = sparse.random(6, 5, density=.5, format='csr', dtype=np.float32)
+    mask = np.array([True, False, True, False, False, True])
+    restricted = restrict_rows(matrix, mask)
+    expected = matrix.toarray()
+    expected[~mask] = 0
+    assert restricted.shape == matrix.shape
+    assert restricted.nnz == matrix[mask].nnz
+    nt.assert_allclose(restricted.toarray(), expected)
+
+def test_blocks_share_memory():
+    """
+    The blocks of rows and their transposes are views of the matrix, for the adjoint as well.
+    """
+    matrix, op = get_operator(3)
+    blocks = op._map_blocks(lambda rows, block: block)
+    transposes = op._map_blocks(lambda rows, block: block, transpose=True)
+    for block in blocks + transposes:
+        assert np.shares_memory(block.data, op.matrix.data)
+    ys = np.random.rand(4, 5)
+    result = op.adjoint.apply_many(ys)
+    assert result.shape == (4, 3, 4)
+    for y, r in zip(ys, result):
+        nt.assert_allclose(r, op.adjoint(y), rtol=1e-5)